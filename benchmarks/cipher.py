@@ -0,0 +1,111 @@
+"""
+Throughput benchmark for the virtual disk cipher.
+
+Compares the original byte-by-byte SimpleEncryptor (list comprehension plus
+hex) with the block XOR, the streaming API over file objects, and a full
+write/read of a file through VirtualFileSystem. Reports MB/s per size;
+results are written as JSON with --out.
+
+    python benchmarks/cipher.py
+    python benchmarks/cipher.py --sizes 1M,64M --out cipher.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import platform
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyslyphie.shell.sysm import SimpleEncryptor, VirtualDisk, VirtualFileSystem
+
+KEY = "benchmark-key"
+
+
+def legacy_encrypt(key: bytes, data: bytes) -> str:
+    return bytes([b ^ key[i % len(key)] for i, b in enumerate(data)]).hex()
+
+def legacy_decrypt(key: bytes, hex_str: str) -> bytes:
+    data = bytes.fromhex(hex_str)
+    return bytes([b ^ key[i % len(key)] for i, b in enumerate(data)])
+
+def parse_size(text: str) -> int:
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper()
+    return int(float(text[:-1]) * units[text[-1]]) if text[-1] in units else int(text)
+
+def mb_per_s(size: int, fn, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return size / (1 << 20) / best if best else float("inf")
+
+def run(size: int, legacy_max: int, tmpdir: str) -> dict:
+    enc = SimpleEncryptor(KEY)
+    data = os.urandom(size)
+    result = {"size": size}
+
+    if size <= legacy_max:
+        hex_str = legacy_encrypt(enc.key, data)
+        assert legacy_decrypt(enc.key, hex_str) == data
+        result["legacy_encrypt"] = mb_per_s(size, lambda: legacy_encrypt(enc.key, data), repeat=1)
+        result["legacy_decrypt"] = mb_per_s(size, lambda: legacy_decrypt(enc.key, hex_str), repeat=1)
+        assert enc.xor(data) == bytes.fromhex(hex_str)
+
+    cipher = enc.xor(data)
+    assert enc.xor(cipher) == data
+    result["xor"] = mb_per_s(size, lambda: enc.xor(data))
+    result["encrypt_stream"] = mb_per_s(size, lambda: enc.encrypt_stream(io.BytesIO(data), io.BytesIO()))
+    result["decrypt_stream"] = mb_per_s(size, lambda: enc.decrypt_stream(cipher, io.BytesIO()))
+
+    path = os.path.join(tmpdir, f"bench-{size}.img")
+    with contextlib.redirect_stdout(io.StringIO()):
+        disk = VirtualDisk(path, (size * 2 + (16 << 20)) / (1 << 30))
+        fs = VirtualFileSystem(disk, KEY)
+        result["vfs_write"] = mb_per_s(size, lambda: fs.write_stream("/bench.bin", io.BytesIO(data)))
+        out = io.BytesIO()
+        result["vfs_read"] = mb_per_s(size, lambda: (out.seek(0), fs.read_stream("/bench.bin", out)))
+        assert out.getvalue()[:size] == data
+    disk.close()
+    os.remove(path)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="64K,1M,16M", help="comma separated payload sizes (K, M, G suffixes)")
+    parser.add_argument("--legacy-max", default="16M", help="skip the byte-by-byte cipher above this size")
+    parser.add_argument("--out", help="write results to this JSON file")
+    opts = parser.parse_args()
+
+    legacy_max = parse_size(opts.legacy_max)
+    results = []
+    fmt = lambda x: f"{x:10.1f}" if x is not None else f"{'-':>10}"
+    print(f"{'size':>10} {'legacy enc':>10} {'legacy dec':>10} {'xor':>10} {'enc strm':>10} "
+          f"{'dec strm':>10} {'vfs write':>10} {'vfs read':>10}   (MB/s)")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in (parse_size(s) for s in opts.sizes.split(",")):
+            r = run(size, legacy_max, tmpdir)
+            results.append(r)
+            print(f"{size:>10} {fmt(r.get('legacy_encrypt'))} {fmt(r.get('legacy_decrypt'))} {fmt(r['xor'])} "
+                  f"{fmt(r['encrypt_stream'])} {fmt(r['decrypt_stream'])} {fmt(r['vfs_write'])} {fmt(r['vfs_read'])}")
+
+    if opts.out:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.time(),
+            "results": results,
+        }
+        with open(opts.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {opts.out}")
+
+if __name__ == "__main__":
+    main()
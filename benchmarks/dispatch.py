@@ -0,0 +1,191 @@
+"""
+Dispatch-path benchmark for the module/job engine.
+
+Registers stub handlers and pushes jobs through exec_module_cmd -> executor ->
+_run_job -> get_job at several worker counts, measuring throughput, submit
+latency, completion latency percentiles and RSS. RSS is sampled from
+/proc/self/statm (or psutil) while each scenario runs, so a scenario reports
+its own peak rather than the process's high-water mark. Results are written as
+JSON; pass a previous run as --baseline to compare against it.
+
+    python benchmarks/dispatch.py --out benchmarks/baseline.json
+    python benchmarks/dispatch.py --baseline benchmarks/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyslyphie.shell import fnt
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def noop(args, **kwargs):
+    return None
+
+def sleep(args, **kwargs):
+    time.sleep(args[0] if args else 0.005)
+
+def spin(args, **kwargs):
+    n = 0
+    for i in range(args[0] if args else 20000):
+        n += i * i
+    return n
+
+def gen(args, **kwargs):
+    for i in range(args[0] if args else 10):
+        yield i
+
+HANDLERS = {"noop": noop, "sleep": sleep, "spin": spin, "gen": gen}
+
+
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_KB
+    except (OSError, IndexError, ValueError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss // 1024
+    return None
+
+class RssSampler:
+    """Samples current RSS every `interval` seconds until stopped and keeps the maximum."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start_kb = self.peak_kb = current_rss_kb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._note(current_rss_kb())
+
+    def _note(self, rss):
+        if rss is not None and (self.peak_kb is None or rss > self.peak_kb):
+            self.peak_kb = rss
+
+    def __enter__(self):
+        if self.start_kb is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._note(current_rss_kb())
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(50), "p95": pick(95), "p99": pick(99), "max": ordered[-1],
+    }
+
+def run(handler: str, workers: int, jobs: int) -> dict:
+    fnt.configure_executor(max_workers=workers)
+    submit = []
+    job_ids = []
+    completion = []
+    failed = 0
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        for _ in range(jobs):
+            t0 = time.perf_counter()
+            res = fnt.exec_module_cmd("bench", handler, "[]", None)
+            submit.append(time.perf_counter() - t0)
+            if "job_id" not in res:
+                raise RuntimeError(f"submit failed: {res}")
+            job_ids.append(res["job_id"])
+
+        for job_id in job_ids:
+            j = fnt.wait_job(job_id, timeout=120)
+            if j.get("status") != "done":
+                failed += 1
+                continue
+            completion.append(j["finished"] - j["created"])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "handler": handler,
+        "workers": workers,
+        "jobs": jobs,
+        "failed": failed,
+        "elapsed_s": elapsed,
+        "jobs_per_s": jobs / elapsed if elapsed else None,
+        "submit_latency_s": percentiles(submit),
+        "completion_latency_s": percentiles(completion),
+        "start_rss_kb": rss.start_kb,
+        "peak_rss_kb": rss.peak_kb,
+    }
+
+def compare(results: list, baseline: dict):
+    old = {(r["handler"], r["workers"]): r for r in baseline.get("results", [])}
+    print(f"\n{'handler':8} {'workers':>7} {'jobs/s':>10} {'vs base':>8} {'p95 done':>10} {'vs base':>8}")
+    for r in results:
+        b = old.get((r["handler"], r["workers"]))
+        p95 = r["completion_latency_s"].get("p95")
+        rate_ratio = r["jobs_per_s"] / b["jobs_per_s"] if b and b.get("jobs_per_s") else None
+        b95 = b["completion_latency_s"].get("p95") if b else None
+        p95_ratio = p95 / b95 if p95 is not None and b95 else None
+        fmt = lambda x: f"{x:.2f}x" if x is not None else "-"
+        print(f"{r['handler']:8} {r['workers']:>7} {r['jobs_per_s']:>10.0f} {fmt(rate_ratio):>8} "
+              f"{(p95 or 0) * 1000:>8.2f}ms {fmt(p95_ratio):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000, help="jobs per scenario")
+    parser.add_argument("--workers", default="1,4,16,64", help="comma separated max_workers levels")
+    parser.add_argument("--handlers", default=",".join(HANDLERS), help="comma separated stub handlers")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous results file")
+    opts = parser.parse_args()
+
+    fnt.register_module("bench", {"desc": "Benchmark stubs", "coalesce": False, "commands": {}}, HANDLERS)
+    fnt.configure_admission(max_queued=opts.jobs, session_quota=0)
+    fnt.configure_job_store(max_jobs=opts.jobs * 2)
+
+    results = []
+    for handler in opts.handlers.split(","):
+        for workers in (int(w) for w in opts.workers.split(",")):
+            r = run(handler, workers, opts.jobs)
+            results.append(r)
+            c = r["completion_latency_s"]
+            print(f"{handler:6} workers={workers:<3} {r['jobs_per_s']:9.0f} jobs/s  "
+                  f"submit p50={r['submit_latency_s']['p50'] * 1e6:7.1f}us  "
+                  f"done p50={c.get('p50', 0) * 1000:8.2f}ms p99={c.get('p99', 0) * 1000:8.2f}ms  "
+                  f"rss={r['start_rss_kb']}->{r['peak_rss_kb']}KiB")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "created": time.time(),
+        "results": results,
+    }
+    if opts.out:
+        with open(opts.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {opts.out}")
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
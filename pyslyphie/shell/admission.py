@@ -0,0 +1,78 @@
+import threading
+from typing import Dict, Optional
+
+DEFAULT_SESSION_QUOTA = 512
+
+
+class Admission:
+    """
+    Quotas on outstanding (queued or running) jobs, checked before a job is
+    created: per module (`module_quotas`, falling back to `module_quota`) and
+    per session (`session_quota`). A session is whoever submits the job,
+    usually one webview window.
+
+    `acquire` returns None when the job may go ahead, else the reason it was
+    refused; every admitted job must be given back with `release`.
+    """
+
+    def __init__(self, module_quota: Optional[int] = None, session_quota: Optional[int] = DEFAULT_SESSION_QUOTA):
+        self.module_quota = module_quota
+        self.session_quota = session_quota
+        self.module_quotas: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, tuple] = {}  # job_id -> (module, session)
+        self._modules: Dict[str, int] = {}
+        self._sessions: Dict[str, int] = {}
+        self.rejected = {"module_quota": 0, "session_quota": 0}
+
+    def configure(self, module_quota: Optional[int] = None, session_quota: Optional[int] = None,
+                  module_quotas: Optional[Dict[str, Optional[int]]] = None):
+        with self._lock:
+            if module_quota is not None:
+                self.module_quota = max(1, int(module_quota)) if module_quota else None
+            if session_quota is not None:
+                self.session_quota = max(1, int(session_quota)) if session_quota else None
+            for module, quota in (module_quotas or {}).items():
+                self.set_quota(module, quota)
+
+    def set_quota(self, module: str, quota: Optional[int]):
+        if quota:
+            self.module_quotas[module] = max(1, int(quota))
+        else:
+            self.module_quotas.pop(module, None)
+
+    def acquire(self, job_id: str, module: str, session: str) -> Optional[str]:
+        with self._lock:
+            quota = self.module_quotas.get(module, self.module_quota)
+            if quota is not None and self._modules.get(module, 0) >= quota:
+                self.rejected["module_quota"] += 1
+                return "module_quota"
+            if self.session_quota is not None and self._sessions.get(session, 0) >= self.session_quota:
+                self.rejected["session_quota"] += 1
+                return "session_quota"
+            self._jobs[job_id] = (module, session)
+            self._modules[module] = self._modules.get(module, 0) + 1
+            self._sessions[session] = self._sessions.get(session, 0) + 1
+            return None
+
+    def release(self, job_id: str):
+        with self._lock:
+            entry = self._jobs.pop(job_id, None)
+            if entry is None:
+                return
+            module, session = entry
+            for counts, key in ((self._modules, module), (self._sessions, session)):
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "module_quota": self.module_quota,
+                "module_quotas": dict(self.module_quotas),
+                "session_quota": self.session_quota,
+                "outstanding_by_module": dict(self._modules),
+                "outstanding_by_session": dict(self._sessions),
+                "rejected": dict(self.rejected),
+            }
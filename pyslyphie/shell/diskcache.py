@@ -0,0 +1,159 @@
+import os
+import time
+import zlib
+import pickle
+import hashlib
+import threading
+from typing import Any, Optional
+
+CACHE_DIR = os.environ.get("PYSLYPHIE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "pyslyphie")
+
+MISSING = object()
+
+
+def digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8", errors="surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent cache tier in one SQLite file, safe to share between processes.
+
+    Keys are hashed (see `digest`), values are pickled and zlib-compressed.
+    Entries expire after their ttl; when the file holds more than `max_bytes`
+    of values the least recently read ones are deleted, down to 90% of the
+    cap. The database runs in WAL mode and is opened on first use, so
+    declaring a cache costs nothing until it is read. Database errors are
+    counted and treated as misses: the cache never breaks the call it sits
+    behind.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024, level: int = 6):
+        self.path = path or os.path.join(CACHE_DIR, "cache.sqlite")
+        self.max_bytes = max_bytes
+        self.level = level
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expired": 0, "errors": 0}
+
+    def _conn(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            import sqlite3
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key      TEXT PRIMARY KEY,
+                    value    BLOB NOT NULL,
+                    size     INTEGER NOT NULL,
+                    expires  REAL,
+                    accessed REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+            """)
+            self._local.db = db
+        return db
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def get(self, key: str) -> Any:
+        """The cached value, or MISSING."""
+        try:
+            db = self._conn()
+            row = db.execute("SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None:
+                self._count("misses")
+                return MISSING
+            if row[1] is not None and row[1] <= now:
+                db.execute("DELETE FROM entries WHERE key = ? AND expires <= ?", (key, now))
+                self._count("expired")
+                self._count("misses")
+                return MISSING
+            if now - row[2] > 60:  # keep LRU order without a write on every read
+                db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            value = pickle.loads(zlib.decompress(row[0]))
+        except Exception:
+            self._count("errors")
+            return MISSING
+        self._count("hits")
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.level)
+        except Exception:
+            self._count("errors")  # unpicklable value, keep it in memory only
+            return
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl if ttl else None, now),
+            )
+            self._count("writes")
+            self._sweep()
+        except Exception:
+            self._count("errors")
+
+    def delete(self, key: str):
+        try:
+            self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except Exception:
+            self._count("errors")
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM entries")
+        except Exception:
+            self._count("errors")
+
+    def _sweep(self, force: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_sweep < 1.0:
+                return
+            self._last_sweep = now
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            expired = db.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),)).rowcount
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            evicted = 0
+            if total > self.max_bytes:
+                target = total - int(self.max_bytes * 0.9)
+                victims, freed = [], 0
+                for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= target:
+                        break
+                db.executemany("DELETE FROM entries WHERE key = ?", victims)
+                evicted = len(victims)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self._count("expired", max(expired, 0))
+        self._count("evictions", evicted)
+
+    def stats(self) -> dict:
+        try:
+            entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except Exception:
+            entries = size = None
+        with self._lock:
+            return {"path": self.path, "entries": entries, "bytes": size, "max_bytes": self.max_bytes, **self.counters}
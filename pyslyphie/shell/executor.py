@@ -0,0 +1,357 @@
+import os
+import heapq
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+DEFAULT_MAX_QUEUE = 1024
+DEFAULT_MAX_ASYNC = 1000
+DEFAULT_MAX_PROCESSES = os.cpu_count() or 1
+DEFAULT_MAX_DETACHED = DEFAULT_MAX_WORKERS
+IDLE_TIMEOUT = 30.0
+
+# priority classes, lower runs first
+PRIORITIES = {"interactive": 0, "normal": 1, "bulk": 2}
+
+
+class QueueFull(Exception):
+    pass
+
+
+def priority_of(name) -> int:
+    if isinstance(name, int):
+        return min(max(name, 0), len(PRIORITIES) - 1)
+    return PRIORITIES.get(name or "normal", PRIORITIES["normal"])
+
+
+def _warm():
+    import pyslyphie.shell.fnt  # noqa: F401  pay the import in the child before the first job
+
+
+class _Running:
+    __slots__ = ("module", "deadline", "detached", "future")
+
+    def __init__(self, module: str, deadline: Optional[float], future=None):
+        self.module = module
+        self.deadline = deadline
+        self.detached = False
+        self.future = future
+
+
+class JobExecutor:
+    """
+    Shared worker pool behind exec_module_cmd.
+
+    Jobs wait in one bounded queue, split into priority classes, and are picked
+    up by at most `max_workers` threads. A module may declare a concurrency
+    limit; jobs of a module that is at its limit are skipped until one of its
+    slots frees up. Idle workers exit after IDLE_TIMEOUT.
+
+    A running job that is cancelled or runs past its timeout gives its slot
+    back at once: its worker is detached from the pool (a replacement is
+    started if work is waiting) and exits when the handler finally returns.
+    At most `max_detached` detached threads are tolerated; past that no
+    replacements are started, so hung handlers cannot grow the thread count
+    beyond max_workers + max_detached.
+    `on_abort(job_id, reason)` is called for every job that times out.
+
+    Coroutine jobs share the same queue, priorities and module limits but do
+    not hold a worker: they run on one event loop thread owned by the
+    executor, at most `max_async` at a time, and are cancelled on the loop
+    when aborted.
+
+    `process_pool` is a spawn-context ProcessPoolExecutor for CPU-bound work,
+    created and warmed on first use so GIL-heavy handlers run on other cores.
+    A pool task cannot be stopped on its own, so `recycle_processes` kills the
+    pool's processes and the next use starts a fresh pool; `process_generation`
+    tells callers whose tasks failed whether that is why.
+    Spawned processes import the host's __main__ module, so a host script must
+    guard its startup with `if __name__ == "__main__":`.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 max_async: int = DEFAULT_MAX_ASYNC, max_processes: int = DEFAULT_MAX_PROCESSES,
+                 max_detached: int = DEFAULT_MAX_DETACHED):
+        self.max_workers = max_workers
+        self.max_detached = max_detached
+        self.max_queue = max_queue
+        self.max_async = max_async
+        self.max_processes = max_processes
+        self._processes = None
+        self.process_generation = 0
+        self.on_abort: Optional[Callable[[str, str], None]] = None
+        self._cond = threading.Condition()
+        self._pending = [deque() for _ in PRIORITIES]  # (job_id, module, fn, timeout, coroutine)
+        self._queued = 0
+        self._queued_sync = 0
+        self._workers = 0
+        self._detached = 0  # threads still stuck in a detached handler
+        self._async = 0
+        self._loop = None  # asyncio loop, imported and started on first coroutine job
+        self._idle = 0
+        self._active: Dict[str, int] = {}
+        self._limits: Dict[str, int] = {}
+        self._running: Dict[str, _Running] = {}
+        self._deadlines: list = []  # heap of (deadline, job_id)
+        self._watchdog: Optional[threading.Thread] = None
+
+    def configure(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                  max_async: Optional[int] = None, max_processes: Optional[int] = None,
+                  max_detached: Optional[int] = None):
+        with self._cond:
+            if max_processes is not None and max(1, int(max_processes)) != self.max_processes:
+                self.max_processes = max(1, int(max_processes))
+                if self._processes is not None:
+                    self._processes.shutdown(wait=False)
+                    self._processes = None
+            if max_workers is not None:
+                self.max_workers = max(1, int(max_workers))
+            if max_queue is not None:
+                self.max_queue = max(1, int(max_queue))
+            if max_async is not None:
+                self.max_async = max(1, int(max_async))
+            if max_detached is not None:
+                self.max_detached = max(0, int(max_detached))
+            self._wake()
+
+    def set_limit(self, module: str, limit: Optional[int]):
+        with self._cond:
+            if limit:
+                self._limits[module] = max(1, int(limit))
+            else:
+                self._limits.pop(module, None)
+            self._wake()
+
+    def submit(self, job_id: str, module: str, fn: Callable, priority="normal",
+               timeout: Optional[float] = None, coroutine: bool = False):
+        """
+        fn is called with no arguments on a worker thread, or, with coroutine=True,
+        must return an awaitable that is run on the executor's event loop.
+        """
+        with self._cond:
+            if self._queued >= self.max_queue:
+                raise QueueFull(f"job queue is full ({self.max_queue})")
+            self._pending[priority_of(priority)].append((job_id, module, fn, timeout, coroutine))
+            self._queued += 1
+            self._queued_sync += not coroutine
+            self._wake()
+
+    @property
+    def loop(self):
+        """The shared event loop, started on first use."""
+        with self._cond:
+            if self._loop is None:
+                import asyncio
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="fnt-loop", daemon=True).start()
+            return self._loop
+
+    @property
+    def process_pool(self):
+        """Shared process pool for cpu_bound commands, started and warmed on first use."""
+        with self._cond:
+            if self._processes is not None and getattr(self._processes, "_broken", False):
+                self._processes.shutdown(wait=False)
+                self._processes = None
+            if self._processes is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._processes = ProcessPoolExecutor(self.max_processes, mp_context=multiprocessing.get_context("spawn"))
+                for _ in range(self.max_processes):
+                    self._processes.submit(_warm)
+            return self._processes
+
+    def recycle_processes(self):
+        """Terminate every process of the pool, and with them the tasks they run."""
+        with self._cond:
+            pool, self._processes = self._processes, None
+            self.process_generation += 1
+        if pool is None:
+            return
+        for proc in list((getattr(pool, "_processes", None) or {}).values()):
+            proc.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Drop a queued job or detach a running one. Returns its former state, or None."""
+        with self._cond:
+            for queue in self._pending:
+                for item in queue:
+                    if item[0] == job_id:
+                        queue.remove(item)
+                        self._queued -= 1
+                        self._queued_sync -= not item[4]
+                        return "queued"
+            if self._detach(job_id):
+                return "running"
+        return None
+
+    def active(self, module: str) -> int:
+        with self._cond:
+            return self._active.get(module, 0)
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return self._queued
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        with self._cond:
+            pos = 0
+            for queue in self._pending:
+                for item in queue:
+                    if item[0] == job_id:
+                        return pos
+                    pos += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._cond:
+            detached = sum(1 for entry in self._running.values() if entry.detached)
+            return {
+                "workers": self._workers,
+                "idle": self._idle,
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "queued_by_priority": {name: len(self._pending[p]) for name, p in PRIORITIES.items()},
+                "max_queue": self.max_queue,
+                "running": len(self._running) - detached,
+                "detached": detached,
+                "detached_threads": self._detached,
+                "max_detached": self.max_detached,
+                "async_running": self._async,
+                "max_async": self.max_async,
+                "max_processes": self.max_processes,
+                "process_pool": self._processes is not None,
+                "process_recycles": self.process_generation,
+                "active": dict(self._active),
+                "limits": dict(self._limits),
+            }
+
+    # internals, called with self._cond held
+
+    def _wake(self):
+        self._dispatch_async()
+        if (self._queued_sync > self._idle and self._workers < self.max_workers
+                and self._workers + self._detached < self.max_workers + self.max_detached):
+            self._workers += 1
+            threading.Thread(target=self._worker, name=f"fnt-worker-{self._workers}", daemon=True).start()
+        self._cond.notify_all()
+
+    def _take(self, coroutine: bool = False):
+        for queue in self._pending:
+            for item in queue:
+                if item[4] != coroutine:
+                    continue
+                module = item[1]
+                limit = self._limits.get(module)
+                if limit is None or self._active.get(module, 0) < limit:
+                    queue.remove(item)
+                    self._queued -= 1
+                    self._queued_sync -= not coroutine
+                    self._active[module] = self._active.get(module, 0) + 1
+                    return item
+        return None
+
+    def _dispatch_async(self):
+        import asyncio
+        while self._async < self.max_async:
+            item = self._take(coroutine=True)
+            if item is None:
+                return
+            job_id, module, fn, timeout, _ = item
+            self._async += 1
+            entry = _Running(module, None)
+            self._running[job_id] = entry
+            entry.future = asyncio.run_coroutine_threadsafe(self._run_async(job_id, entry, fn, timeout), self.loop)
+
+    async def _run_async(self, job_id: str, entry: _Running, fn: Callable, timeout: Optional[float]):
+        import asyncio
+        timed_out = False
+        try:
+            await asyncio.wait_for(fn(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+        except asyncio.CancelledError:
+            pass
+        finally:
+            with self._cond:
+                self._running.pop(job_id, None)
+                if not entry.detached:
+                    self._active[entry.module] -= 1
+                    self._async -= 1
+                    self._wake()
+        if timed_out and self.on_abort:
+            self.on_abort(job_id, "timeout")
+
+    def _start(self, job_id: str, module: str, timeout: Optional[float]):
+        deadline = time.monotonic() + timeout if timeout else None
+        self._running[job_id] = _Running(module, deadline)
+        if deadline is not None:
+            heapq.heappush(self._deadlines, (deadline, job_id))
+            if self._watchdog is None:
+                self._watchdog = threading.Thread(target=self._watch, name="fnt-watchdog", daemon=True)
+                self._watchdog.start()
+            self._cond.notify_all()
+
+    def _detach(self, job_id: str) -> bool:
+        entry = self._running.get(job_id)
+        if entry is None or entry.detached:
+            return False
+        entry.detached = True
+        self._active[entry.module] -= 1
+        if entry.future is not None:
+            entry.future.cancel()
+            self._async -= 1
+        else:
+            self._workers -= 1
+            self._detached += 1
+        self._wake()
+        return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                item = self._take()
+                while item is None:
+                    if self._workers > self.max_workers:
+                        self._workers -= 1
+                        return
+                    self._idle += 1
+                    woke = self._cond.wait(IDLE_TIMEOUT)
+                    self._idle -= 1
+                    item = self._take()
+                    if item is None and not woke:
+                        self._workers -= 1
+                        return
+                job_id, module, fn, timeout, _ = item
+                self._start(job_id, module, timeout)
+            try:
+                fn()
+            finally:
+                with self._cond:
+                    entry = self._running.pop(job_id)
+                    if entry.detached:
+                        self._detached -= 1
+                        self._wake()
+                        return
+                    self._active[module] -= 1
+                    self._wake()
+
+    def _watch(self):
+        while True:
+            expired = []
+            with self._cond:
+                now = time.monotonic()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    _, job_id = heapq.heappop(self._deadlines)
+                    if self._detach(job_id):
+                        expired.append(job_id)
+                if not expired:
+                    wait = self._deadlines[0][0] - now if self._deadlines else None
+                    self._cond.wait(wait)
+            for job_id in expired:
+                if self.on_abort:
+                    self.on_abort(job_id, "timeout")
@@ -1,60 +1,437 @@
+from __future__ import annotations
+
 import json
-import threading
+import time
 import uuid
-from typing import Dict, Any
-from webview import Window
+import inspect
+import importlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Union
 
+from .admission import Admission
+from .executor import JobExecutor, QueueFull
+from .jobstore import FINISHED, JobStore, SQLiteJobStore
+from .limiter import AIMDLimiter
+from .metrics import Metrics
+from .notify import JobNotifier
+from .pipeline import Pipeline, PipelineError
 
-from .modules.net import (
-    sl__net__domrtrace, sl__net__domtrace, sl__net__ping,
-    sl__net__lis, sl__net__ip
-)
+if TYPE_CHECKING:
+    from webview import Window
 
-from .modules.ocam import (
-    sl__ocam__upind, sl__ocam__add, sl__ocam__get, sl__ocam__len,
-    sl__ocam__list, sl__ocam__rsfeed, sl__ocam__for, 
-    CAMS_IP
-)
+# Handlers are registered by import path and only imported on first use, so
+# importing fnt does not pull in webview, requests or the module packages.
+_LAZY_ATTRS = {
+    "CAMS_IP": ".modules.ocam:CAMS_IP",
+    "Window": "webview:Window",
+}
 
-from .modules.sstring import (
-    sl__string__h2s, sl__string__s2h, sl__string__fcomb,
-)
+def resolve(path: str):
+    """Import "package.module:attr" (or "package.module.attr"); leading dots are relative to this package."""
+    if ":" in path:
+        mod_name, attr = path.split(":", 1)
+    else:
+        mod_name, _, attr = path.rpartition(".")
+    obj = importlib.import_module(mod_name, package=__package__)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+def __getattr__(name: str):
+    # keeps `from pyslyphie.shell.fnt import CAMS_IP, sl__net__ip` working
+    path = _LAZY_ATTRS.get(name)
+    for mod in MODULES.values() if path is None else ():
+        for handler in mod["handlers"].values():
+            if isinstance(handler, str) and handler.endswith(":" + name):
+                path = handler
+            elif getattr(handler, "__name__", None) == name:
+                return handler
+    if path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = resolve(path)
+    globals()[name] = value
+    return value
 
 # In-memory module registry (plugins should call register_module)
 MODULES: Dict[str, Dict[str, Any]] = {}
-JOBS: Dict[str, Dict[str, Any]] = {}  # jobId -> {status, out, error}
+JOBS = JobStore()  # jobId -> {status, out, error}
+EXECUTOR = JobExecutor()
+METRICS = Metrics()
+LIMITERS: Dict[str, AIMDLimiter] = {}  # modules with an adaptive concurrency limit
+ADMISSION = Admission()
+GROUPS: "OrderedDict[str, tuple]" = OrderedDict()  # groupId -> (job ids in submission order, {index: error})
+MAX_GROUPS = 1024
+_GROUPS_LOCK = threading.Lock()
+PIPELINES: "OrderedDict[str, Pipeline]" = OrderedDict()  # capped at MAX_GROUPS as well
+
+_RESOLVE_LOCK = threading.Lock()
+
+# single-flight and result cache, keyed on (module, command, canonical args)
+INFLIGHT: Dict[tuple, str] = {}
+RESULT_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires, job_id)
+MAX_CACHED_RESULTS = 4096
+_JOB_KEYS: Dict[str, tuple] = {}  # in-flight job_id -> (key, cache_ttl)
+_FLIGHT_LOCK = threading.Lock()
+
+# completion events for wait_job / wait_any, and callbacks for pipelines
+_WAITERS: Dict[str, List[threading.Event]] = {}
+_CALLBACKS: Dict[str, List[Callable[[str, str], None]]] = {}
+_WAITERS_LOCK = threading.Lock()
+WAIT_RECHECK = 1.0  # also re-read the store this often, for jobs finished by another process
+
+# opt-in push notifications, per webview window
+NOTIFIERS: Dict[int, JobNotifier] = {}  # id(window) -> notifier
+_JOB_NOTIFIERS: Dict[str, set] = {}  # job_id -> notifiers of the windows that submitted it
+_NOTIFY_LOCK = threading.Lock()
+
+def _finish(job_id: str, status: str, **fields):
+    """Single place where a job reaches a final status."""
+    if not JOBS.update(job_id, status=status, finished=time.time(), **fields):
+        return False
+    ADMISSION.release(job_id)
+    ran = METRICS.finished(job_id, status)
+    if ran is not None and status != "cancelled":
+        _adapt(ran[0], ran[1], status == "done")
+    with _WAITERS_LOCK:
+        waiters = _WAITERS.pop(job_id, ())
+        callbacks = _CALLBACKS.pop(job_id, ())
+    for event in waiters:
+        event.set()
+    with _NOTIFY_LOCK:
+        notifiers = _JOB_NOTIFIERS.pop(job_id, ())
+    for notifier in notifiers:
+        notifier.finished(job_id, status)
+    with _FLIGHT_LOCK:
+        key, ttl = _JOB_KEYS.pop(job_id, (None, None))
+        if key is not None and INFLIGHT.get(key) == job_id:
+            del INFLIGHT[key]
+        if key is not None and ttl and status == "done":
+            RESULT_CACHE[key] = (time.monotonic() + ttl, job_id)
+            RESULT_CACHE.move_to_end(key)
+            while len(RESULT_CACHE) > MAX_CACHED_RESULTS:
+                RESULT_CACHE.popitem(last=False)
+    for callback in callbacks:
+        try:
+            callback(job_id, status)
+        except Exception as e:
+            print(f"[fnt] Job callback failed for {job_id}: {type(e).__name__}: {e}")
+    return True
+
+def _when_finished(job_id: str, callback: Callable[[str, str], None]):
+    """Call callback(job_id, status) once the job is finished; at once if it already is."""
+    with _WAITERS_LOCK:
+        _CALLBACKS.setdefault(job_id, []).append(callback)
+    status = JOBS.status(job_id)
+    if status is not None and status not in FINISHED:
+        return
+    with _WAITERS_LOCK:
+        callbacks = _CALLBACKS.get(job_id, [])
+        if callback not in callbacks:
+            return  # _finish got there first
+        callbacks.remove(callback)
+        if not callbacks:
+            del _CALLBACKS[job_id]
+    callback(job_id, status or "error")
+
+def _adapt(module: str, seconds: float, ok: bool):
+    limiter = LIMITERS.get(module)
+    if limiter is None:
+        return
+    limit = limiter.record(seconds, ok, EXECUTOR.active(module))
+    if limit is not None:
+        EXECUTOR.set_limit(module, limit)
+
+def _abort_job(job_id: str, reason: str):
+    _finish(job_id, reason, error=f"job {reason}")
+
+EXECUTOR.on_abort = _abort_job
+
+def configure_executor(max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                       max_async: Optional[int] = None, max_processes: Optional[int] = None,
+                       max_detached: Optional[int] = None):
+    """
+    max_workers: global cap on worker threads shared by every module
+    max_queue: jobs allowed to wait for a worker before submissions are refused
+    max_async: cap on coroutine handlers running at once on the shared event loop
+    max_processes: size of the process pool used by cpu_bound commands; its processes are spawned and
+        import the host's __main__, so the host script must keep its startup under `if __name__ == "__main__":`
+    max_detached: threads of timed-out or cancelled handlers tolerated before no replacements are started
+    """
+    EXECUTOR.configure(max_workers=max_workers, max_queue=max_queue, max_async=max_async,
+                       max_processes=max_processes, max_detached=max_detached)
+    return EXECUTOR.stats()
+
+def configure_admission(max_queued: Optional[int] = None, module_quota: Optional[int] = None,
+                        session_quota: Optional[int] = None, module_quotas: Optional[Dict[str, int]] = None):
+    """
+    max_queued: jobs allowed to wait for a worker (the executor's max_queue)
+    module_quota / module_quotas: outstanding jobs allowed per module, by default or for given modules
+    session_quota: outstanding jobs allowed per session (one webview window, unless a session is passed)
+    A quota of 0 removes it. Over-limit submissions get a "busy" response with retry_after_ms.
+    """
+    if max_queued is not None:
+        EXECUTOR.configure(max_queue=max_queued)
+    ADMISSION.configure(module_quota=module_quota, session_quota=session_quota, module_quotas=module_quotas)
+    return {"max_queued": EXECUTOR.max_queue, **ADMISSION.stats()}
+
+def _session_of(js: Optional[Window], session: Optional[str]) -> str:
+    if session is not None:
+        return str(session)
+    return f"window-{id(js)}" if js is not None else "local"
+
+def _busy(reason: str, module: str, command: str):
+    """Structured refusal: nothing was queued, try again after retry_after_ms."""
+    parallel = EXECUTOR.stats()["limits"].get(module) or EXECUTOR.max_workers
+    mean = METRICS.mean_latency(module, command) or 0.1
+    backlog = (EXECUTOR.queue_depth() + EXECUTOR.active(module)) / parallel
+    retry_after_ms = int(min(max(mean * (backlog + 1), 0.05), 60.0) * 1000)
+    message = {
+        "queue_full": f"job queue is full ({EXECUTOR.max_queue})",
+        "module_quota": f"too many outstanding jobs for module {module}",
+        "session_quota": "too many outstanding jobs for this session",
+    }.get(reason, reason)
+    return {"error": f"busy: {message}", "busy": True, "reason": reason, "retry_after_ms": retry_after_ms}
+
+def use_job_store(store):
+    """
+    Swap the job store, e.g. for a SQLiteJobStore shared by several processes:
+
+        use_job_store(SQLiteJobStore("jobs.db")); recover_jobs()
+    """
+    global JOBS
+    JOBS = store
+    return JOBS.stats()
+
+def recover_jobs(js: Optional[Window] = None):
+    """
+    Resume jobs a dead process left behind in a durable store: queued jobs are
+    queued again here, jobs that were mid-run are marked as interrupted.
+    """
+    recoverable = getattr(JOBS, "recoverable", None)
+    if recoverable is None:
+        return {"requeued": [], "interrupted": []}
+    requeued, interrupted = [], []
+    for job_id, owner, rec in recoverable():
+        if not JOBS.claim(job_id, owner):
+            continue
+        found = _lookup(rec["module"], rec["command"]) if rec["status"] == "queued" else None
+        if isinstance(found, tuple):
+            try:
+                METRICS.queued(job_id, rec["module"], rec["command"])
+                _enqueue(job_id, found[0], rec["command"], found[1], rec.get("args") or [], js)
+                requeued.append(job_id)
+                continue
+            except QueueFull:
+                METRICS.finished(job_id, "rejected")
+        reason = found["error"] if isinstance(found, dict) else "interrupted by restart"
+        _finish(job_id, "error", error=reason)
+        interrupted.append(job_id)
+    return {"requeued": requeued, "interrupted": interrupted}
+
+def configure_job_store(ttl: Optional[float] = None, max_jobs: Optional[int] = None,
+                        max_bytes: Optional[int] = None, spill_bytes: Optional[int] = None,
+                        blob_dir: Optional[str] = None):
+    """
+    ttl: seconds a finished job is kept
+    max_jobs / max_bytes: caps on stored jobs and on the total size of their outputs (LRU eviction)
+    spill_bytes: outputs this large are kept in a temp-file blob instead of memory
+    Returns the store stats, including eviction counters.
+    """
+    JOBS.configure(ttl=ttl, max_jobs=max_jobs, max_bytes=max_bytes,
+                   spill_bytes=spill_bytes, blob_dir=blob_dir)
+    return JOBS.stats()
+
+def job_store_stats():
+    return JOBS.stats()
 
 def register_module(name: str, schema: dict, handler_map: dict):
     """
-    schema: {desc: str, commands: {cmd: {desc}}}
+    schema: {desc: str, concurrency?: int, adaptive?: bool | dict, quota?: int,
+             commands: {cmd: {desc, priority?, timeout?, cache_ttl?, coalesce?, cpu_bound?}}}
     handler_map: { "submodule?": { "command": callable(args)->result_or_stream } }
+                 a handler may be an import path string ("pkg.module:func"), imported on first call
+                 handlers may be `async def`; they run on the job engine's event loop
+                 handlers may be (async) generators; each yielded chunk is appended to the job as it comes
+
+    concurrency caps how many jobs of this module run at once in the shared pool.
+    With adaptive (true, or AIMDLimiter options such as {"maximum": 16, "target_p95": 5})
+    that cap becomes the starting point of a limit that grows while the module's
+    latency and error rate stay healthy and is halved when they degrade.
+    priority is "interactive", "normal" or "bulk"; timeout is in seconds. Both can
+    also be set at module level as defaults for every command.
+    quota caps this module's outstanding (queued or running) jobs; past it
+    submissions get a "busy" response instead of a job.
+    Identical calls (same module, command and args) that are still in flight share
+    one job unless coalesce is False; with cache_ttl (seconds) a finished result is
+    reused for identical calls without running the handler again.
+    cpu_bound commands run in the shared process pool: the handler must be importable
+    (a module-level function or import path), it gets args but no `js`, and its result
+    (a generator is collected into a list) must be picklable. Pool processes are spawned and
+    re-import the host's __main__, which therefore needs an `if __name__ == "__main__":` guard.
     """
-    MODULES[name] = {"schema": schema, "handlers": handler_map}
+    MODULES[name] = {"name": name, "schema": schema, "handlers": handler_map}
+    ADMISSION.set_quota(name, schema.get("quota"))
+    adaptive = schema.get("adaptive")
+    if adaptive:
+        options = adaptive if isinstance(adaptive, dict) else {}
+        LIMITERS[name] = AIMDLimiter(initial=schema.get("concurrency") or 4, **options)
+        EXECUTOR.set_limit(name, LIMITERS[name].limit)
+    else:
+        LIMITERS.pop(name, None)
+        EXECUTOR.set_limit(name, schema.get("concurrency"))
+
+def _command_option(mod: dict, command: str, key: str, default=None):
+    schema = mod["schema"]
+    cmd = schema.get("commands", {}).get(command, {})
+    return cmd.get(key, schema.get(key, default))
 
 def list_modules():
     meta = {name: mod["schema"] for name, mod in MODULES.items()}
     return meta
 
+def get_metrics(reset: bool = False):
+    """
+    Per "module.command": latency and queue_wait percentiles (seconds), final
+    status counts, error_rate, in-flight gauges and cache/coalesce hits.
+    Also the current adaptive limits per module, and the executor and job store state.
+    """
+    meta = {
+        "commands": METRICS.snapshot(),
+        "limits": {name: limiter.snapshot() for name, limiter in LIMITERS.items()},
+        "admission": ADMISSION.stats(),
+        "executor": EXECUTOR.stats(),
+        "store": JOBS.stats(),
+    }
+    if reset:
+        METRICS.reset()
+    return meta
+
+def enable_notifications(js: Window, interval: float = 1 / 30, function: str = "_api_jobs_notify"):
+    """
+    Push job events to this window instead of making it poll: jobs it submits
+    are reported to `window.<function>(batch)` at most once per `interval`
+    seconds, where batch = {"finished": {job_id: status}, "progress": {job_id: cursor}}.
+    """
+    with _NOTIFY_LOCK:
+        old = NOTIFIERS.pop(id(js), None)
+        NOTIFIERS[id(js)] = JobNotifier(js, interval=interval, function=function)
+    if old:
+        old.close()
+    return {"status": "enabled", "interval": interval, "function": function}
+
+def disable_notifications(js: Window):
+    with _NOTIFY_LOCK:
+        notifier = NOTIFIERS.pop(id(js), None)
+        if notifier:
+            for notifiers in _JOB_NOTIFIERS.values():
+                notifiers.discard(notifier)
+    if notifier:
+        notifier.close()
+    return {"status": "disabled"}
+
+def _subscribe(job_id: str, js: Optional[Window]):
+    if js is None or not NOTIFIERS:
+        return
+    with _NOTIFY_LOCK:
+        notifier = NOTIFIERS.get(id(js))
+        if notifier:
+            _JOB_NOTIFIERS.setdefault(job_id, set()).add(notifier)
+
+def _append(job_id: str, chunk, cursor: int) -> bool:
+    if not JOBS.append(job_id, chunk):
+        return False
+    with _NOTIFY_LOCK:
+        notifiers = tuple(_JOB_NOTIFIERS.get(job_id, ()))
+    for notifier in notifiers:
+        notifier.progress(job_id, cursor)
+    return True
+
+def _job_started(job_id: str):
+    JOBS.update(job_id, status="running", started=time.time())
+    METRICS.started(job_id)
+
 def _run_job(job_id: str, func, *args, **kwargs):
-    JOBS[job_id]["status"] = "running"
+    _job_started(job_id)
     try:
         res = func(*args, **kwargs)
-        JOBS[job_id]["status"] = "done"
-        JOBS[job_id]["out"] = res
+        if inspect.isgenerator(res):
+            JOBS.update(job_id, stream=True, out=[], cursor=0)
+            for cursor, chunk in enumerate(res, 1):
+                if not _append(job_id, chunk, cursor):
+                    res.close()
+                    return
+            _finish(job_id, "done")
+        else:
+            _finish(job_id, "done", out=res)
     except Exception as e:
-        JOBS[job_id]["status"] = "error"
-        JOBS[job_id]["error"] = f"{type(e).__name__}: {e}"
+        _finish(job_id, "error", error=f"{type(e).__name__}: {e}")
 
-def exec_module_cmd(module: str, command: str, args_json: str, js : Window):
+async def _run_job_async(job_id: str, func, *args, **kwargs):
+    _job_started(job_id)
+    try:
+        res = func(*args, **kwargs)
+        if inspect.isasyncgen(res):
+            JOBS.update(job_id, stream=True, out=[], cursor=0)
+            cursor = 0
+            async for chunk in res:
+                cursor += 1
+                if not _append(job_id, chunk, cursor):
+                    await res.aclose()
+                    return
+            _finish(job_id, "done")
+        else:
+            _finish(job_id, "done", out=await res)
+    except Exception as e:
+        _finish(job_id, "error", error=f"{type(e).__name__}: {e}")
+
+def _run_cpu(handler, args):
+    # runs in a pool process
+    if isinstance(handler, str):
+        handler = resolve(handler)
+    res = handler(args)
+    if inspect.isgenerator(res):
+        res = list(res)
+    return res
+
+async def _run_job_process(job_id: str, handler, args):
+    import asyncio
+    from concurrent.futures.process import BrokenProcessPool
+    _job_started(job_id)
+    try:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            generation = EXECUTOR.process_generation
+            try:
+                res = await loop.run_in_executor(EXECUTOR.process_pool, _run_cpu, handler, args)
+                break
+            except (BrokenProcessPool, RuntimeError):
+                # the pool was recycled under us for another job's timeout: run again on the new one
+                if attempt or EXECUTOR.process_generation == generation:
+                    raise
+        _finish(job_id, "done", out=res)
+    except asyncio.CancelledError:
+        # timed out or cancelled: the handler would keep its process busy, so kill the pool
+        EXECUTOR.recycle_processes()
+        raise
+    except Exception as e:
+        _finish(job_id, "error", error=f"{type(e).__name__}: {e}")
+
+def exec_module_cmd(module: str, command: str, args_json: str, js : Window, session: Optional[str] = None):
     """
     Called synchronously from JS, but we return quickly with job id and spawn thread for heavy tasks.
     args_json is JSON string array of args.
+    session defaults to the calling window; quotas are counted per session.
+    When a quota or the queue is full, returns {"error", "busy": True, "reason", "retry_after_ms"}.
     """
     try:
         args = json.loads(args_json)
     except:
         args = []
+    return _submit(module, command, args, js, session)
 
+def _lookup(module: str, command: str):
+    """(module entry, handler), or an error response."""
     mod = MODULES.get(module)
     if not mod:
         return {"error": f"Module not found: {module}"}
@@ -62,19 +439,378 @@ def exec_module_cmd(module: str, command: str, args_json: str, js : Window):
     handler = mod["handlers"].get(command)
     if not handler:
         return {"error": f"Command not found: {command} in {module}"}
+    if isinstance(handler, str):
+        try:
+            handler = _resolve_handler(mod, command)
+        except Exception as e:
+            return {"error": f"Could not load {command} in {module}: {type(e).__name__}: {e}"}
+    return mod, handler
+
+def _submit(module: str, command: str, args: list, js: Window, session: Optional[str] = None):
+    found = _lookup(module, command)
+    if isinstance(found, dict):
+        return found
+    mod, handler = found
+
+    coalesce = _command_option(mod, command, "coalesce", True)
+    cache_ttl = _command_option(mod, command, "cache_ttl")
+    key = _call_key(module, command, args) if (coalesce or cache_ttl) else None
 
-    job_id = str(uuid.uuid4())
-    JOBS[job_id] = {"status": "queued", "out": None, "error": None, "module": module, "command": command}
-    t = threading.Thread(target=_run_job, args=(job_id, handler, args), daemon=True, kwargs={'js' : js})
-    t.start()
+    with _FLIGHT_LOCK:
+        if cache_ttl:
+            hit = RESULT_CACHE.get(key)
+            if hit and hit[0] > time.monotonic() and hit[1] in JOBS:
+                METRICS.hit(module, command, "cached")
+                return {"job_id": hit[1], "status": "done", "cached": True}
+            RESULT_CACHE.pop(key, None)
+        if coalesce and key in INFLIGHT:
+            shared = JOBS.get(INFLIGHT[key])
+            if shared:
+                METRICS.hit(module, command, "coalesced")
+                _subscribe(INFLIGHT[key], js)
+                return {"job_id": INFLIGHT[key], "status": shared["status"], "coalesced": True}
+
+        job_id = str(uuid.uuid4())
+        refused = ADMISSION.acquire(job_id, module, _session_of(js, session))
+        if refused:
+            METRICS.rejected(module, command)
+            return _busy(refused, module, command)
+        JOBS[job_id] = {"status": "queued", "out": None, "error": None, "module": module, "command": command,
+                        "args": args, "created": time.time()}
+        METRICS.queued(job_id, module, command)
+        _subscribe(job_id, js)
+        try:
+            _enqueue(job_id, mod, command, handler, args, js)
+        except QueueFull:
+            JOBS.pop(job_id, None)
+            ADMISSION.release(job_id)
+            with _NOTIFY_LOCK:
+                _JOB_NOTIFIERS.pop(job_id, None)
+            METRICS.finished(job_id, "rejected")
+            return _busy("queue_full", module, command)
+        if key is not None:
+            _JOB_KEYS[job_id] = (key, cache_ttl)
+            if coalesce:
+                INFLIGHT[key] = job_id
     return {"job_id": job_id, "status": "queued"}
 
-def get_job(job_id):
-    j = JOBS.get(job_id)
+def _enqueue(job_id: str, mod: dict, command: str, handler: Callable, args: list, js: Window):
+    if _command_option(mod, command, "cpu_bound", False):
+        coroutine, run = True, lambda: _run_job_process(job_id, handler, args)
+    else:
+        coroutine = inspect.iscoroutinefunction(handler) or inspect.isasyncgenfunction(handler)
+        runner = _run_job_async if coroutine else _run_job
+        run = lambda: runner(job_id, handler, args, js=js)
+    EXECUTOR.submit(
+        job_id, mod["name"], run,
+        priority=_command_option(mod, command, "priority", "normal"),
+        timeout=_command_option(mod, command, "timeout"),
+        coroutine=coroutine,
+    )
+
+def _resolve_handler(mod: dict, command: str) -> Callable:
+    with _RESOLVE_LOCK:
+        handler = mod["handlers"][command]
+        if isinstance(handler, str):
+            handler = resolve(handler)
+            mod["handlers"][command] = handler
+        return handler
+
+def _call_key(module: str, command: str, args) -> tuple:
+    try:
+        canon = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+    except (TypeError, ValueError):
+        canon = repr(args)
+    return (module, command, canon)
+
+def clear_result_cache(module: Optional[str] = None):
+    """Forget cached results, for one module or for all of them."""
+    with _FLIGHT_LOCK:
+        for key in [k for k in RESULT_CACHE if module is None or k[0] == module]:
+            del RESULT_CACHE[key]
+
+def get_job(job_id, since: Optional[int] = None):
+    """
+    For streaming jobs `out` is the list of chunks produced so far and `cursor`
+    is its length; pass the last cursor as `since` to get only the new chunks.
+    """
+    j = JOBS.get(job_id, since=since)
     if not j:
+        reason = JOBS.evicted(job_id)
+        if reason:
+            return {"error": "job evicted", "reason": reason}
         return {"error": "job not found"}
+    j["queue_depth"] = EXECUTOR.queue_depth()
+    if j["status"] == "queued":
+        j["queue_position"] = EXECUTOR.queue_position(job_id)
+    return j
+
+def exec_module_cmd_batch(calls: Union[str, list], js : Window, session: Optional[str] = None):
+    """
+    Submit many commands at once and track them as one group.
+    calls is a list (or JSON string of a list) of [module, command, args].
+    A call that cannot be queued gets an error entry at its position in get_jobs.
+    """
+    if isinstance(calls, str):
+        try:
+            calls = json.loads(calls)
+        except:
+            return {"error": "calls must be a JSON array of [module, command, args]"}
+
+    job_ids: List[Optional[str]] = []
+    errors: Dict[int, str] = {}
+    for i, call in enumerate(calls or []):
+        if not isinstance(call, (list, tuple)) or len(call) < 2:
+            job_ids.append(None)
+            errors[i] = "call must be [module, command, args]"
+            continue
+        module, command = call[0], call[1]
+        args = call[2] if len(call) > 2 and isinstance(call[2], list) else []
+        res = _submit(module, command, args, js, session)
+        job_ids.append(res.get("job_id"))
+        if "error" in res:
+            errors[i] = res["error"]
+
+    group_id = str(uuid.uuid4())
+    with _GROUPS_LOCK:
+        GROUPS[group_id] = (job_ids, errors)
+        while len(GROUPS) > MAX_GROUPS:
+            GROUPS.popitem(last=False)
+    return {"group_id": group_id, "job_ids": job_ids, "status": "queued", "rejected": len(errors)}
+
+def get_jobs(group: Union[str, list]):
+    """
+    Poll a whole group (or a list of job ids) at once.
+    Returns the aggregate status, completion counts and every job in submission order.
+    """
+    if isinstance(group, str):
+        with _GROUPS_LOCK:
+            entry = GROUPS.get(group)
+        if entry is None:
+            return {"error": "group not found"}
+        job_ids, errors = entry
+    else:
+        job_ids, errors = list(group), {}
+
+    results = []
+    counts = {"queued": 0, "running": 0}
+    for i, job_id in enumerate(job_ids):
+        j = JOBS.get(job_id) if job_id else None
+        if j is None:
+            reason = errors.get(i) or (JOBS.evicted(job_id) and "job evicted") or "job not found"
+            j = {"status": "error", "out": None, "error": reason}
+        counts[j["status"]] = counts.get(j["status"], 0) + 1
+        results.append({
+            "job_id": job_id, "status": j["status"], "out": j.get("out"),
+            "error": j.get("error"), "module": j.get("module"), "command": j.get("command"),
+        })
+
+    total = len(job_ids)
+    pending = counts["queued"] + counts["running"]
+    if pending == total and counts["running"] == 0:
+        status = "queued"
+    elif pending:
+        status = "running"
+    elif counts.get("done", 0) == total:
+        status = "done"
+    elif counts.get("done", 0) == 0:
+        status = "error"
+    else:
+        status = "partial"
+    return {
+        "group_id": group if isinstance(group, str) else None,
+        "status": status,
+        "total": total,
+        "completed": total - pending,
+        "failed": total - pending - counts.get("done", 0),
+        "counts": counts,
+        "queue_depth": EXECUTOR.queue_depth(),
+        "results": results,
+    }
+
+def exec_pipeline(steps: Union[str, dict], js : Window, session: Optional[str] = None):
+    """
+    Run a small DAG of commands entirely in the job engine.
+    steps is an object (or JSON string) of name -> {module, command, args, after?}.
+    {"$ref": "name"} or {"$ref": "name.0.url"} anywhere in args is replaced by
+    (part of) that step's output; a step starts as soon as the steps it
+    references, or lists in "after", are done. Independent steps run concurrently.
+
+        exec_pipeline({
+            "cams": {"module": "ocam", "command": "for", "args": ["Japan"]},
+            "imgs": {"module": "ocam", "command": "get", "args": [{"$ref": "cams"}]},
+        }, js)
+    """
+    if isinstance(steps, str):
+        try:
+            steps = json.loads(steps)
+        except:
+            return {"error": "steps must be a JSON object of name -> step"}
+    try:
+        pipeline = Pipeline(steps)
+    except PipelineError as e:
+        return {"error": str(e)}
+
+    pipeline_id = str(uuid.uuid4())
+    with _GROUPS_LOCK:
+        PIPELINES[pipeline_id] = pipeline
+        while len(PIPELINES) > MAX_GROUPS:
+            PIPELINES.popitem(last=False)
+    with pipeline.lock:
+        ready = pipeline.take_ready()
+    _start_steps(pipeline, ready, js, session)
+    with pipeline.lock:
+        return {"pipeline_id": pipeline_id, "status": "queued", "job_ids": dict(pipeline.jobs),
+                "errors": dict(pipeline.errors)}
+
+def _start_steps(pipeline: Pipeline, names: List[str], js: Window, session: Optional[str]):
+    for name in names:
+        step = pipeline.steps[name]
+        with pipeline.lock:
+            try:
+                args = pipeline.args(name)
+            except PipelineError as e:
+                pipeline.finished(name, False, error=str(e))
+                continue
+        res = _submit(step["module"], step["command"], args, js, session)
+        if "error" in res:
+            with pipeline.lock:
+                pipeline.finished(name, False, error=res["error"])
+            continue
+        with pipeline.lock:
+            pipeline.jobs[name] = res["job_id"]
+            cancelled = pipeline.cancelled
+        if cancelled:
+            cancel_job(res["job_id"])
+        _when_finished(res["job_id"], lambda job_id, status, name=name: _step_finished(pipeline, name, job_id, status, js, session))
+
+def _step_finished(pipeline: Pipeline, name: str, job_id: str, status: str, js: Window, session: Optional[str]):
+    j = JOBS.get(job_id)
+    with pipeline.lock:
+        if status == "done" and j is not None:
+            pipeline.finished(name, True, out=j.get("out"))
+        else:
+            error = (j or {}).get("error") or (JOBS.evicted(job_id) and "job evicted") or f"job {status}"
+            pipeline.finished(name, False, error=error)
+        ready = pipeline.take_ready()
+    _start_steps(pipeline, ready, js, session)
+
+def get_pipeline(pipeline_id: str):
+    """
+    Status of every step (its job's status once submitted, else "waiting" or
+    "skipped") with its output, and the aggregate status: "running" while any
+    step is pending, then "done", "partial", "error" or "cancelled".
+    """
+    with _GROUPS_LOCK:
+        pipeline = PIPELINES.get(pipeline_id)
+    if pipeline is None:
+        return {"error": "pipeline not found"}
+    with pipeline.lock:
+        state, jobs, errors = dict(pipeline.state), dict(pipeline.jobs), dict(pipeline.errors)
+        pending, cancelled = pipeline.pending(), pipeline.cancelled
+
+    steps = {}
+    for name, step in pipeline.steps.items():
+        job_id = jobs.get(name)
+        j = JOBS.get(job_id) if job_id else None
+        status = j["status"] if j else {"failed": "error"}.get(state[name], state[name])
+        steps[name] = {
+            "job_id": job_id, "status": status, "out": j.get("out") if j else None,
+            "error": (j or {}).get("error") or errors.get(name),
+            "module": step["module"], "command": step["command"],
+        }
+
+    done = sum(1 for s in state.values() if s == "done")
+    if pending:
+        status = "running"
+    elif cancelled:
+        status = "cancelled"
+    elif done == len(state):
+        status = "done"
+    else:
+        status = "partial" if done else "error"
+    return {
+        "pipeline_id": pipeline_id,
+        "status": status,
+        "total": len(state),
+        "completed": sum(1 for s in state.values() if s not in ("waiting", "submitted")),
+        "steps": steps,
+    }
+
+def cancel_pipeline(pipeline_id: str):
+    """Skip the steps that have not started and cancel the ones that have."""
+    with _GROUPS_LOCK:
+        pipeline = PIPELINES.get(pipeline_id)
+    if pipeline is None:
+        return {"error": "pipeline not found"}
+    with pipeline.lock:
+        pipeline.cancelled = True
+        pipeline.skip(lambda step: True, "pipeline cancelled")
+        running = [pipeline.jobs[name] for name, s in pipeline.state.items() if s == "submitted" and name in pipeline.jobs]
+    for job_id in running:
+        cancel_job(job_id)
+    return get_pipeline(pipeline_id)
+
+def _wait(job_ids: List[str], timeout: Optional[float]) -> List[str]:
+    """Block until one of job_ids is finished (or gone); returns those that are."""
+    event = threading.Event()
+    with _WAITERS_LOCK:
+        for job_id in job_ids:
+            _WAITERS.setdefault(job_id, []).append(event)
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            ready = []
+            for job_id in job_ids:
+                status = JOBS.status(job_id)
+                if status is None or status in FINISHED:
+                    ready.append(job_id)
+            if ready:
+                return ready
+            left = WAIT_RECHECK if deadline is None else min(WAIT_RECHECK, deadline - time.monotonic())
+            if left <= 0:
+                return []
+            event.wait(left)
+            event.clear()
+    finally:
+        with _WAITERS_LOCK:
+            for job_id in job_ids:
+                waiters = _WAITERS.get(job_id)
+                if waiters and event in waiters:
+                    waiters.remove(event)
+                    if not waiters:
+                        del _WAITERS[job_id]
+
+def wait_job(job_id, timeout: Optional[float] = None):
+    """
+    Block until the job finishes or `timeout` seconds pass, then return get_job(job_id).
+    On timeout the job is still queued/running and "timed_out" is set.
+    """
+    done = _wait([job_id], timeout)
+    j = get_job(job_id)
+    if not done:
+        j["timed_out"] = True
     return j
 
+def wait_any(job_ids: List[str], timeout: Optional[float] = None):
+    """
+    Block until at least one of the jobs finishes or `timeout` seconds pass.
+    Returns {"finished": [...], "pending": [...]}; "finished" is empty on timeout.
+    """
+    job_ids = list(job_ids)
+    finished = _wait(job_ids, timeout) if job_ids else []
+    return {"finished": finished, "pending": [j for j in job_ids if j not in finished]}
+
+def cancel_job(job_id):
+    """Cancel a queued or running job. A running handler is abandoned and its worker slot freed."""
+    j = JOBS.get(job_id)
+    if not j:
+        return {"error": "job not found"}
+    if EXECUTOR.cancel(job_id) is None:
+        return {"error": f"job already {j['status']}", "status": j["status"]}
+    _finish(job_id, "cancelled", error="job cancelled")
+    return {"job_id": job_id, "status": "cancelled"}
+
 def ping_handler(args):
     host = args[0] if args else "8.8.8.8"
     return f"PONG: {host}"
@@ -82,60 +818,68 @@ def ping_handler(args):
 register_module(
     "net",
     {   "desc": "Network utilities", 
+        "concurrency": 8,
+        "adaptive": {"maximum": 32},
         "commands": {
             "ping": {"desc": "Ping host"}, 
-            "domtrace": {"desc": "Trace Domain route"}, 
-            "domrtrace": {"desc": "Reverse-Trace Domain route"},
-            "tcp" : {"desc" : "Runs a tcp scan"},
-            "ip"  : {"desc" : "Get the details of the IP"}
+            "domtrace": {"desc": "Trace Domain route", "cache_ttl": 300}, 
+            "domrtrace": {"desc": "Reverse-Trace Domain route", "cache_ttl": 300},
+            "tcp" : {"desc" : "Runs a tcp scan", "timeout" : 60},
+            "ip"  : {"desc" : "Get the details of the IP", "timeout" : 30, "cache_ttl" : 300}
         }
     },
     {
-        "ping": sl__net__ping, 
-        "domtrace": sl__net__domtrace, 
-        "domrtrace" : sl__net__domrtrace,
-        "tcp" : sl__net__lis,
-        "ip"  : sl__net__ip,
+        "ping": ".modules.net:sl__net__ping",
+        "domtrace": ".modules.net:sl__net__domtrace",
+        "domrtrace" : ".modules.net:sl__net__domrtrace",
+        "tcp" : ".modules.net:sl__net__lis",
+        "ip"  : ".modules.net:sl__net__ip",
     }
 )
 
 register_module(
     "ocam",
     {   "desc": "Gets Open access to World-wide cameras", 
+        "concurrency": 4,
+        "adaptive": {"maximum": 16},
         "commands": {
             "update": {"desc": "Updates the indexs"}, 
             "add": {"desc": "Adds a OpenCamera-URL"}, 
-            "get": {"desc": "Fetches an image from the args"},
-            "len" : {"desc" : "Gets the available cams"},
-            "list"  : {"desc" : "Lists out the available cams"},
-            'feed' : {'desc' : "Feeds Camera to a Monitor"},
-            'for' : {'desc' : "Gets Specific list"},
+            "get": {"desc": "Fetches an image from the args", "priority": "bulk", "timeout": 300},
+            "stream": {"desc": "Fetches images one camera at a time, each as soon as it arrives", "priority": "bulk", "timeout": 300},
+            "len" : {"desc" : "Gets the available cams", "cache_ttl" : 10},
+            "list"  : {"desc" : "Lists out the available cams", "cache_ttl" : 10},
+            'feed' : {'desc' : "Feeds Camera to a Monitor", 'coalesce' : False},
+            'for' : {'desc' : "Gets Specific list", 'cache_ttl' : 10},
 
         }
     },
     {
-        "update": sl__ocam__upind, 
-        "add": sl__ocam__add, 
-        "get" : sl__ocam__get,
-        "len" : sl__ocam__len,
-        "list"  : sl__ocam__list,
-        'feed' : sl__ocam__rsfeed,
-        'for'  : sl__ocam__for,
+        "update": ".modules.ocam:sl__ocam__upind",
+        "add": ".modules.ocam:sl__ocam__add",
+        "get" : ".modules.ocam:sl__ocam__get",
+        "stream" : ".modules.ocam:sl__ocam__stream",
+        "len" : ".modules.ocam:sl__ocam__len",
+        "list"  : ".modules.ocam:sl__ocam__list",
+        'feed' : ".modules.ocam:sl__ocam__rsfeed",
+        'for'  : ".modules.ocam:sl__ocam__for",
     }
 )
 
 register_module(
     "string",
     {   "desc": "String utilities", 
+        "priority": "interactive",
+        "cache_ttl": 300,
         "commands": {
             "h2s": {"desc": "Hex to string"}, 
             "s2h": {"desc": "String to Hex"}, 
-            "fco": {"desc" : "All possible Combinations of a word"}
+            "fco": {"desc" : "All possible Combinations of a word", "priority": "normal", "timeout": 60, "cpu_bound": True}
         }
     },
     {
-        "h2s": sl__string__h2s, 
-        "s2h": sl__string__s2h,
-        "fco": sl__string__fcomb
+        "h2s": ".modules.sstring:sl__string__h2s",
+        "s2h": ".modules.sstring:sl__string__s2h",
+        "fco": ".modules.sstring:sl__string__fcomb"
     }
 )
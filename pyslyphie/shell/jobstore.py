@@ -0,0 +1,523 @@
+import os
+import json
+import atexit
+import time
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+
+FINISHED = ("done", "error", "cancelled", "timeout")
+
+
+def _sizeof(out: Any) -> int:
+    if out is None:
+        return 0
+    if isinstance(out, (bytes, bytearray)):
+        return len(out)
+    if isinstance(out, str):
+        return len(out.encode("utf-8", errors="ignore"))
+    try:
+        return len(json.dumps(out, default=str).encode("utf-8", errors="ignore"))
+    except Exception:
+        return len(str(out))
+
+
+class JobStore:
+    """
+    Job records with retention limits.
+
+    Finished jobs are dropped once they are older than `ttl` seconds, and the
+    least recently read ones are dropped while more than `max_jobs` records or
+    `max_bytes` of output are held. An output of `spill_bytes` or more is
+    written to a temp-file blob and only read back when the job is fetched.
+    Queued and running jobs are never evicted, and a finished job's record is
+    not changed by later updates.
+
+    Streaming jobs keep their output as a list of chunks; `append` adds one and
+    `get(job_id, since=cursor)` returns only the chunks after the cursor.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_jobs: int = 10000,
+                 max_bytes: int = 256 * 1024 * 1024, spill_bytes: int = 1024 * 1024,
+                 blob_dir: Optional[str] = None):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.blob_dir = blob_dir
+        self._own_blob_dir = False
+        self._lock = threading.RLock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._blobs: Dict[str, str] = {}
+        self._bytes = 0
+        self._last_sweep = 0.0
+        self._evicted: deque = deque(maxlen=1024)  # (job_id, reason)
+        self._counters = {"evicted_ttl": 0, "evicted_count": 0, "evicted_bytes": 0, "spilled": 0}
+
+    def configure(self, **limits):
+        with self._lock:
+            for name in ("ttl", "max_jobs", "max_bytes", "spill_bytes", "blob_dir"):
+                if limits.get(name) is not None:
+                    setattr(self, name, limits[name])
+            self._enforce(sweep=True)
+
+    # dict-style access used by fnt
+
+    def __setitem__(self, job_id: str, record: Dict[str, Any]):
+        with self._lock:
+            self._drop(job_id)
+            self._jobs[job_id] = dict(record)
+            self._enforce()
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def get(self, job_id: str, default=None, since: Optional[int] = None):
+        """Copy of the record with a spilled output loaded back from disk."""
+        with self._lock:
+            self._expire()
+            rec = self._jobs.get(job_id)
+            if rec is None:
+                return default
+            self._jobs.move_to_end(job_id)
+            rec = dict(rec)
+            blob = self._blobs.get(job_id)
+            if rec.get("stream") and blob is None:
+                rec["out"] = rec["out"][since or 0:]
+        if blob is not None:
+            try:
+                with open(blob, "rb") as f:
+                    rec["out"] = pickle.load(f)
+            except Exception as e:
+                rec["error"] = f"result blob unavailable: {e}"
+            else:
+                if rec.get("stream"):
+                    rec["out"] = rec["out"][since or 0:]
+        return rec
+
+    def status(self, job_id: str) -> Optional[str]:
+        rec = self._jobs.get(job_id)
+        return rec.get("status") if rec is not None else None
+
+    def pop(self, job_id: str, default=None):
+        with self._lock:
+            rec = self.get(job_id, default)
+            self._drop(job_id)
+            return rec
+
+    def update(self, job_id: str, **fields) -> bool:
+        """Apply fields to a job. False if it is gone or already finished."""
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None or rec.get("status") in FINISHED:
+                return False
+            if "out" in fields:
+                self._set_out(job_id, fields.pop("out"))
+            rec.update(fields)
+            if rec.get("status") in FINISHED:
+                rec.setdefault("finished", time.time())
+                if rec.get("stream"):
+                    self._set_out(job_id, rec["out"])
+                self._enforce()
+            return True
+
+    def append(self, job_id: str, chunk: Any) -> bool:
+        """Add one chunk to a streaming job. False once the job has finished."""
+        with self._lock:
+            rec = self._jobs.get(job_id)
+            if rec is None or rec.get("status") in FINISHED:
+                return False
+            if not rec.get("stream"):
+                rec["stream"] = True
+                rec["out"] = []
+            rec["out"].append(chunk)
+            size = _sizeof(chunk)
+            self._sizes[job_id] = self._sizes.get(job_id, 0) + size
+            self._bytes += size
+            rec["cursor"] = len(rec["out"])
+            return True
+
+    def evicted(self, job_id: str) -> Optional[str]:
+        """Reason a recently evicted job is gone, or None."""
+        for jid, reason in reversed(self._evicted):
+            if jid == job_id:
+                return reason
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                self._counters,
+                jobs=len(self._jobs),
+                bytes=self._bytes,
+                spilled_jobs=len(self._blobs),
+                ttl=self.ttl,
+                max_jobs=self.max_jobs,
+                max_bytes=self.max_bytes,
+                spill_bytes=self.spill_bytes,
+            )
+
+    # internals
+
+    def _set_out(self, job_id: str, out: Any):
+        self._release_out(job_id)
+        size = _sizeof(out)
+        rec = self._jobs[job_id]
+        if self.spill_bytes and size >= self.spill_bytes:
+            path = self._spill(job_id, out)
+            if path is not None:
+                self._blobs[job_id] = path
+                out = None
+        rec["out"] = out
+        self._sizes[job_id] = size
+        self._bytes += size
+
+    def _spill(self, job_id: str, out: Any) -> Optional[str]:
+        try:
+            if self.blob_dir is None:
+                self.blob_dir = tempfile.mkdtemp(prefix="pyslyphie-jobs-")
+                self._own_blob_dir = True
+                atexit.register(self._remove_blob_dir)  # nobody else removes a temp dir we made
+            os.makedirs(self.blob_dir, exist_ok=True)
+            path = os.path.join(self.blob_dir, f"{job_id}.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(out, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._counters["spilled"] += 1
+            return path
+        except Exception:
+            return None
+
+    def _release_out(self, job_id: str):
+        self._bytes -= self._sizes.pop(job_id, 0)
+        blob = self._blobs.pop(job_id, None)
+        if blob is not None:
+            try:
+                os.remove(blob)
+            except OSError:
+                pass
+
+    def _drop(self, job_id: str):
+        if job_id in self._jobs:
+            self._release_out(job_id)
+            del self._jobs[job_id]
+
+    def _evict(self, job_id: str, reason: str):
+        self._drop(job_id)
+        self._evicted.append((job_id, reason))
+        self._counters[f"evicted_{reason}"] += 1
+
+    def _expire(self, sweep: bool = False):
+        now = time.time()
+        if not self.ttl or (not sweep and now - self._last_sweep < 1.0):
+            return
+        self._last_sweep = now
+        cutoff = now - self.ttl
+        for job_id, rec in list(self._jobs.items()):
+            if rec.get("status") in FINISHED and rec.get("finished", cutoff) < cutoff:
+                self._evict(job_id, "ttl")
+
+    def _enforce(self, sweep: bool = False):
+        self._expire(sweep)
+        for job_id in list(self._jobs):
+            over_count = self.max_jobs and len(self._jobs) > self.max_jobs
+            over_bytes = self.max_bytes and self._bytes > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            if self._jobs[job_id].get("status") in FINISHED:
+                self._evict(job_id, "count" if over_count else "bytes")
+
+    def close(self):
+        with self._lock:
+            for job_id in list(self._blobs):
+                self._release_out(job_id)
+            if self._own_blob_dir and self.blob_dir:
+                atexit.unregister(self._remove_blob_dir)
+                self._remove_blob_dir()
+                self.blob_dir = None
+                self._own_blob_dir = False
+
+    def _remove_blob_dir(self):
+        # also runs at exit, without the lock: a daemon thread may hold it then
+        if self.blob_dir:
+            shutil.rmtree(self.blob_dir, ignore_errors=True)
+
+
+class SQLiteJobStore:
+    """
+    Durable job store with the same interface as JobStore, shared by every
+    process that opens the same database file.
+
+    The database runs in WAL mode so readers never block the writer. Jobs are
+    indexed by (status, created) and by finish time; an output is pickled and
+    written once, when the job finishes, and stream chunks go to their own
+    table. `owner` records which process runs a job so that a restarted
+    process can pick up queued jobs whose owner is gone (see `recoverable`).
+    """
+
+    COLUMNS = ("status", "module", "command", "args", "created", "started", "finished",
+               "error", "out", "stream", "cursor", "owner")
+
+    def __init__(self, path: str, ttl: float = 24 * 3600.0, max_jobs: int = 100000):
+        import sqlite3
+        self._sqlite3 = sqlite3
+        self.path = path
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.owner = f"{os.uname().nodename if hasattr(os, 'uname') else ''}:{os.getpid()}"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._evicted: deque = deque(maxlen=1024)
+        self._counters = {"evicted_ttl": 0, "evicted_count": 0}
+        with self._conn() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id   TEXT PRIMARY KEY,
+                    status   TEXT NOT NULL,
+                    module   TEXT,
+                    command  TEXT,
+                    args     TEXT,
+                    created  REAL,
+                    started  REAL,
+                    finished REAL,
+                    error    TEXT,
+                    out      BLOB,
+                    stream   INTEGER NOT NULL DEFAULT 0,
+                    cursor   INTEGER NOT NULL DEFAULT 0,
+                    owner    TEXT,
+                    extra    TEXT
+                );
+                CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+                CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished);
+                CREATE TABLE IF NOT EXISTS chunks (
+                    job_id TEXT NOT NULL,
+                    seq    INTEGER NOT NULL,
+                    data   BLOB,
+                    PRIMARY KEY (job_id, seq)
+                ) WITHOUT ROWID;
+            """)
+
+    def _conn(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            self._local.db = db
+        return db
+
+    def configure(self, **limits):
+        for name in ("ttl", "max_jobs"):
+            if limits.get(name) is not None:
+                setattr(self, name, limits[name])
+        self._sweep(force=True)
+
+    def __setitem__(self, job_id: str, record: Dict[str, Any]):
+        row = self._row(record)
+        row.setdefault("owner", self.owner)
+        cols = ["job_id"] + list(row)
+        self._conn().execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            [job_id] + list(row.values()),
+        )
+        self._sweep()
+
+    def __contains__(self, job_id: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def get(self, job_id: str, default=None, since: Optional[int] = None):
+        db = self._conn()
+        row = db.execute(
+            "SELECT status, module, command, args, created, started, finished, error, out, stream, cursor, extra "
+            "FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return default
+        status, module, command, args, created, started, finished, error, out, stream, cursor, extra = row
+        rec = json.loads(extra) if extra else {}
+        rec.update(status=status, module=module, command=command, error=error, created=created)
+        if args is not None:
+            rec["args"] = json.loads(args)
+        if started is not None:
+            rec["started"] = started
+        if finished is not None:
+            rec["finished"] = finished
+        if stream:
+            chunks = db.execute(
+                "SELECT data FROM chunks WHERE job_id = ? AND seq >= ? ORDER BY seq", (job_id, since or 0)
+            ).fetchall()
+            rec.update(stream=True, cursor=cursor, out=[pickle.loads(c[0]) for c in chunks])
+        else:
+            rec["out"] = pickle.loads(out) if out is not None else None
+        return rec
+
+    def status(self, job_id: str) -> Optional[str]:
+        row = self._conn().execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def pop(self, job_id: str, default=None):
+        rec = self.get(job_id, default)
+        self._delete([job_id])
+        return rec
+
+    def update(self, job_id: str, **fields) -> bool:
+        """Apply fields to a job. False if it is gone or already finished."""
+        row = self._row(fields)
+        extra = {k: v for k, v in fields.items() if k not in self.COLUMNS}
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if extra:
+                cur = db.execute("SELECT extra FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                merged = json.loads(cur[0]) if cur and cur[0] else {}
+                merged.update(extra)
+                row["extra"] = json.dumps(merged, default=str)
+            if not row:
+                db.execute("COMMIT")
+                return job_id in self
+            sets = ", ".join(f"{k} = ?" for k in row)
+            cur = db.execute(
+                f"UPDATE jobs SET {sets} WHERE job_id = ? AND status NOT IN ({', '.join('?' * len(FINISHED))})",
+                list(row.values()) + [job_id] + list(FINISHED),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if cur.rowcount and fields.get("status") in FINISHED:
+            self._sweep()
+        return bool(cur.rowcount)
+
+    def append(self, job_id: str, chunk: Any) -> bool:
+        """Add one chunk to a streaming job. False once the job has finished."""
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT status, cursor FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None or row[0] in FINISHED:
+                db.execute("COMMIT")
+                return False
+            db.execute("INSERT INTO chunks (job_id, seq, data) VALUES (?, ?, ?)",
+                       (job_id, row[1], pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL)))
+            db.execute("UPDATE jobs SET stream = 1, cursor = ? WHERE job_id = ?", (row[1] + 1, job_id))
+            db.execute("COMMIT")
+            return True
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def recoverable(self, alive=None):
+        """
+        Queued and running jobs whose owning process is gone, as (job_id, owner, record).
+        `alive(owner) -> bool` decides; by default an owner on this host is alive
+        while its pid exists, and owners on other hosts are assumed alive.
+        """
+        alive = alive or self._owner_alive
+        rows = self._conn().execute(
+            "SELECT job_id, owner FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+        ).fetchall()
+        return [(job_id, owner, self.get(job_id)) for job_id, owner in rows
+                if owner != self.owner and not alive(owner)]
+
+    def claim(self, job_id: str, previous_owner: Optional[str]) -> bool:
+        """Take over a job from `previous_owner`; only one process wins when several recover at once."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET owner = ? WHERE job_id = ? AND owner IS ?", (self.owner, job_id, previous_owner)
+        )
+        return bool(cur.rowcount)
+
+    def evicted(self, job_id: str) -> Optional[str]:
+        for jid, reason in reversed(self._evicted):
+            if jid == job_id:
+                return reason
+        return None
+
+    def stats(self) -> dict:
+        by_status = dict(self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return dict(self._counters, jobs=sum(by_status.values()), by_status=by_status,
+                    ttl=self.ttl, max_jobs=self.max_jobs, path=self.path)
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # internals
+
+    def _row(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        row = {}
+        for k in self.COLUMNS:
+            if k not in fields:
+                continue
+            v = fields[k]
+            if k == "out":
+                v = pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL) if v is not None else None
+            elif k == "args":
+                v = json.dumps(v, default=str)
+            elif k == "stream":
+                v = int(bool(v))
+            row[k] = v
+        if fields.get("stream") and "out" in row:
+            del row["out"]
+        return row
+
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        if not owner:
+            return False
+        host, _, pid = owner.rpartition(":")
+        if host != self.owner.rpartition(":")[0]:
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def _delete(self, job_ids):
+        db = self._conn()
+        for i in range(0, len(job_ids), 500):
+            part = job_ids[i:i + 500]
+            marks = ", ".join("?" * len(part))
+            db.execute(f"DELETE FROM chunks WHERE job_id IN ({marks})", part)
+            db.execute(f"DELETE FROM jobs WHERE job_id IN ({marks})", part)
+
+    def _sweep(self, force: bool = False):
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < 5.0:
+                return
+            self._last_sweep = now
+        db = self._conn()
+        marks = ", ".join("?" * len(FINISHED))
+        if self.ttl:
+            ids = [r[0] for r in db.execute(
+                f"SELECT job_id FROM jobs WHERE finished < ? AND status IN ({marks})", [now - self.ttl] + list(FINISHED)
+            )]
+            self._forget(ids, "ttl")
+        if self.max_jobs:
+            over = len(self) - self.max_jobs
+            if over > 0:
+                ids = [r[0] for r in db.execute(
+                    f"SELECT job_id FROM jobs WHERE status IN ({marks}) ORDER BY finished LIMIT ?", list(FINISHED) + [over]
+                )]
+                self._forget(ids, "count")
+
+    def _forget(self, job_ids, reason: str):
+        if not job_ids:
+            return
+        self._delete(job_ids)
+        self._evicted.extend((job_id, reason) for job_id in job_ids)
+        self._counters[f"evicted_{reason}"] += len(job_ids)
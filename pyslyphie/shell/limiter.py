@@ -0,0 +1,117 @@
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit for one module.
+
+    Every finished job is recorded with its run time and whether it succeeded.
+    Each `window` jobs the window is judged: if the error rate is above
+    `max_error_rate` or p95 latency is above the target, the limit is cut by
+    `backoff`; otherwise, if the module actually used its whole limit during
+    the window, the limit grows by one. The target is `target_p95` seconds
+    when given, else `tolerance` times the baseline: an exponential moving
+    average (weight `smoothing`) of past window p95s, so one lucky window
+    cannot tighten it for good. A window that follows a raise may only lower
+    the baseline, so latency the raise itself caused never becomes the norm
+    and a creeping overload is still caught. The target is never below
+    `min_latency`, so instant
+    commands are not punished for jitter. Only a burst of errors backs off at
+    once, without waiting for the window to fill.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 64, window: int = 40,
+                 target_p95: Optional[float] = None, tolerance: float = 2.0, min_latency: float = 0.1,
+                 max_error_rate: float = 0.2, backoff: float = 0.5, smoothing: float = 0.2):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = min(max(int(initial), self.minimum), self.maximum)
+        self.window = max(1, int(window))
+        self.target_p95 = target_p95
+        self.tolerance = tolerance
+        self.min_latency = min_latency
+        self.max_error_rate = max_error_rate
+        self.backoff = backoff
+        self.smoothing = min(max(float(smoothing), 0.01), 1.0)
+        self._lock = threading.Lock()
+        self._samples: deque = deque()
+        self._errors = 0
+        self._peak = 0
+        self._baseline: Optional[float] = None
+        self._grew = False
+        self._last_p95: Optional[float] = None
+        self._last_error_rate = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    def record(self, seconds: float, ok: bool, in_flight: int = 0) -> Optional[int]:
+        """Returns the new limit when it changed, else None."""
+        with self._lock:
+            self._samples.append(seconds)
+            self._errors += not ok
+            self._peak = max(self._peak, in_flight)
+            if self._errors > self.max_error_rate * self.window:
+                self._last_error_rate = self._errors / len(self._samples)
+                return self._decrease()
+            if len(self._samples) < self.window:
+                return None
+
+            ordered = sorted(self._samples)
+            p95 = ordered[math.ceil(0.95 * len(ordered)) - 1]  # nearest rank
+            self._last_p95 = p95
+            self._last_error_rate = self._errors / len(ordered)
+            target = self._target()
+            if self._baseline is None:
+                self._baseline = p95
+            elif p95 < self._baseline or not self._grew:
+                # latency seen right after a raise may be the raise's own doing: never learn from it
+                self._baseline += self.smoothing * (p95 - self._baseline)
+            self._grew = False
+            if self._last_error_rate > self.max_error_rate or p95 > target:
+                return self._decrease()
+            saturated = self._peak >= self.limit
+            self._reset()
+            if saturated and self.limit < self.maximum:
+                self.limit += 1
+                self._grew = True
+                self.increases += 1
+                return self.limit
+            return None
+
+    def _decrease(self) -> Optional[int]:
+        self._reset()
+        new = max(self.minimum, int(self.limit * self.backoff))
+        if new == self.limit:
+            return None
+        self.limit = new
+        self.decreases += 1
+        return new
+
+    def _target(self) -> float:
+        if self.target_p95 is not None:
+            return self.target_p95
+        if self._baseline is None:
+            return float("inf")  # the first window only sets the baseline
+        return max(self._baseline * self.tolerance, self.min_latency)
+
+    def _reset(self):
+        self._samples.clear()
+        self._errors = 0
+        self._peak = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "minimum": self.minimum,
+                "maximum": self.maximum,
+                "p95": self._last_p95,
+                "error_rate": self._last_error_rate,
+                "target_p95": self._target() if self._baseline is not None or self.target_p95 is not None else None,
+                "baseline_p95": self._baseline,
+                "increases": self.increases,
+                "decreases": self.decreases,
+            }
@@ -0,0 +1,161 @@
+import time
+import bisect
+import threading
+from typing import Dict, Optional, Tuple
+
+
+# bucket upper bounds in seconds: 0.5ms .. ~20min, about 19% apart
+BOUNDS = [0.0005 * (1.19 ** i) for i in range(90)]
+# 1us .. ~2h, for timing plain function calls
+FINE_BOUNDS = [0.000001 * (1.19 ** i) for i in range(130)]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; constant memory however many samples it sees."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: list = BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
+
+class CommandStats:
+    __slots__ = ("latency", "wait", "statuses", "queued", "running", "cached", "coalesced")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.wait = Histogram()
+        self.statuses: Dict[str, int] = {}
+        self.queued = 0
+        self.running = 0
+        self.cached = 0
+        self.coalesced = 0
+
+    def summary(self) -> dict:
+        finished = sum(self.statuses.values())
+        failed = self.statuses.get("error", 0) + self.statuses.get("timeout", 0)
+        return {
+            "latency": self.latency.summary(),
+            "queue_wait": self.wait.summary(),
+            "statuses": dict(self.statuses),
+            "error_rate": failed / finished if finished else 0.0,
+            "in_flight": {"queued": self.queued, "running": self.running},
+            "cached": self.cached,
+            "coalesced": self.coalesced,
+        }
+
+
+class Metrics:
+    """
+    Per (module, command) job metrics: run latency and queue wait histograms,
+    final status counts and in-flight gauges. Fed by fnt as jobs move through
+    queued -> running -> finished.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands: Dict[Tuple[str, str], CommandStats] = {}
+        self._jobs: Dict[str, list] = {}  # job_id -> [key, queued_at, started_at]
+
+    def _stats(self, key) -> CommandStats:
+        stats = self._commands.get(key)
+        if stats is None:
+            stats = self._commands[key] = CommandStats()
+        return stats
+
+    def queued(self, job_id: str, module: str, command: str):
+        with self._lock:
+            key = (module, command)
+            self._jobs[job_id] = [key, time.perf_counter(), None]
+            self._stats(key).queued += 1
+
+    def started(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job[2] is not None:
+                return
+            job[2] = time.perf_counter()
+            stats = self._stats(job[0])
+            stats.queued -= 1
+            stats.running += 1
+            stats.wait.add(job[2] - job[1])
+
+    def finished(self, job_id: str, status: str) -> Optional[Tuple[str, float]]:
+        """Returns (module, run seconds) for a job that had started, else None."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return None
+            key, queued_at, started_at = job
+            stats = self._stats(key)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if started_at is None:
+                stats.queued -= 1
+                if status != "rejected":
+                    stats.wait.add(time.perf_counter() - queued_at)
+                return None
+            stats.running -= 1
+            seconds = time.perf_counter() - started_at
+            stats.latency.add(seconds)
+            return key[0], seconds
+
+    def rejected(self, module: str, command: str):
+        """Count a call refused before it became a job."""
+        with self._lock:
+            stats = self._stats((module, command))
+            stats.statuses["rejected"] = stats.statuses.get("rejected", 0) + 1
+
+    def mean_latency(self, module: str, command: str) -> Optional[float]:
+        with self._lock:
+            stats = self._commands.get((module, command))
+            return stats.latency.total / stats.latency.count if stats and stats.latency.count else None
+
+    def hit(self, module: str, command: str, kind: str):
+        """Count a call answered by the result cache ("cached") or an in-flight job ("coalesced")."""
+        with self._lock:
+            stats = self._stats((module, command))
+            setattr(stats, kind, getattr(stats, kind) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {f"{m}.{c}": stats.summary() for (m, c), stats in sorted(self._commands.items())}
+
+    def reset(self):
+        """Drop histograms and counters; in-flight gauges are kept."""
+        with self._lock:
+            for stats in self._commands.values():
+                stats.latency, stats.wait = Histogram(), Histogram()
+                stats.statuses = {}
+                stats.cached = stats.coalesced = 0
@@ -14,6 +14,8 @@ from urllib.parse import unquote
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from ..wrappers import acache
+
 USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0 Safari/537.36"
 DEFAULT_CONCURRENCY = 6
 REQUEST_TIMEOUT = 20
@@ -152,6 +154,7 @@ class GlobalTracker:
                 result.add(u)
         return list(result)
 
+    @acache(maxsize=256, ttl=3600, key=lambda self, query, num=100: (query, num))
     async def search(self, query, num=100):
         key = f"{query}:{num}"
         if self.cache and key in self.cache:
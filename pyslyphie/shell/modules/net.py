@@ -4,6 +4,8 @@ import csv
 import io
 import html, requests
 
+REQUEST_TIMEOUT = 10
+
 def ps_csv_to_html(powershell_code: str) -> str:
     """
     Runs a PowerShell command that outputs CSV data, 
@@ -140,7 +142,7 @@ def sl__net__ip(args, **kwargs) :
     if verifiy(args) :
         ip = str(args[0])
         try :
-            parser = requests.get(f'https://ipwhois.app/json/{ip}')
+            parser = requests.get(f'https://ipwhois.app/json/{ip}', timeout=REQUEST_TIMEOUT)
             if parser.status_code == 200 :
                 return json_to_html_table(parser.json())
             else :
@@ -1,5 +1,6 @@
 import requests
-from webview import Window
+
+REQUEST_TIMEOUT = 10
 
 CAMS_IP : dict[str, str] = {
     'Tokyo, Japan (0)' : 'http://220.254.72.200/cgi-bin/camera?resolution=640&quality=1&page=1762458770015&Language=0',
@@ -241,7 +242,7 @@ def sl__ocam__get(args, **kwargs):
         
         if ' '.join(args).strip() in CAMS_IP:
             try:
-                return str(requests.get(CAMS_IP[' '.join(args).strip()]).content)
+                return str(requests.get(CAMS_IP[' '.join(args).strip()], timeout=REQUEST_TIMEOUT).content)
             except Exception as e:
                 return f'<p style="color:red !important;">[-] Error: {e}</p>'
 
@@ -251,7 +252,7 @@ def sl__ocam__get(args, **kwargs):
             for k, url in CAMS_IP.items():
                 if k.split(",")[1].strip().split()[0] == country:
                     try:
-                        result[k] = str(requests.get(url).content)
+                        result[k] = str(requests.get(url, timeout=REQUEST_TIMEOUT).content)
                     except:
                         result[k] = None
             return result
@@ -262,7 +263,7 @@ def sl__ocam__get(args, **kwargs):
             for k, url in CAMS_IP.items():
                 if k.split(",")[0] == city:
                     try:
-                        result[k] = str(requests.get(url).content)
+                        result[k] = str(requests.get(url, timeout=REQUEST_TIMEOUT).content)
                     except:
                         result[k] = None
             return result
@@ -272,6 +273,30 @@ def sl__ocam__get(args, **kwargs):
     
     return '<p style="color:red !important;">[-] Expected at least 1 argument, got 0</p>'
 
+def sl__ocam__stream(args, **kwargs):
+    """Like sl__ocam__get, but yields {key: content} for each camera as soon as it is fetched."""
+    if not verifiy(args):
+        yield '<p style="color:red !important;">[-] Expected at least 1 argument, got 0</p>'
+        return
+
+    key_input = str(args[0]).strip()
+    full_key = ' '.join(args).strip()
+    if full_key in CAMS_IP:
+        keys = [full_key]
+    elif key_input.capitalize() in COU_AVAIL:
+        keys = [k for k in CAMS_IP if k.split(",")[1].strip().split()[0] == key_input.capitalize()]
+    elif key_input.capitalize() in CIT_AVAIL:
+        keys = [k for k in CAMS_IP if k.split(",")[0] == key_input.capitalize()]
+    else:
+        yield f'<p style="color:red !important;">[-] Key/Country/City "{key_input}" not found</p>'
+        return
+
+    for k in keys:
+        try:
+            yield {k: str(requests.get(CAMS_IP[k], timeout=REQUEST_TIMEOUT).content)}
+        except:
+            yield {k: None}
+
 def sl__ocam__list(args, **kwargs) :
     s = ''
     for i in CAMS_IP :
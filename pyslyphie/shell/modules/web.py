@@ -1,10 +1,30 @@
 
-from ..wrappers import cache
+from ..wrappers import cached_method
+from ..diskcache import CACHE_DIR, DiskCache
 from ..utils import ContextUpdater
 from bs4 import BeautifulSoup
 from typing_extensions import Literal
 import requests, json, wikipedia, re
 import urllib.parse
+import os
+
+# search results and page bodies survive restarts and are shared between processes
+WEB_CACHE = DiskCache(os.path.join(CACHE_DIR, "web.sqlite"), max_bytes=512 * 1024 * 1024)
+
+def _succeeded(result) -> bool:
+    """False for a failed reply, or an 'all' reply with a failed part: those are not cached."""
+    if not isinstance(result, dict):
+        return result is not None
+    if result.get('status') is False:
+        return False
+    return all(_succeeded(result[part]) for part in ('web', 'web-api', 'wiki') if part in result)
+
+def _page_ok(result) -> bool:
+    """A page worth caching: fetched, with a status code below 400 (no rate-limit or error pages)."""
+    if not isinstance(result, dict) or not result.get('status'):
+        return False
+    code = result.get('code')
+    return isinstance(code, int) and code < 400
 
 def extract_clean_text(html: str) -> str:
     """
@@ -78,7 +98,8 @@ class UnifiedSearchEngine(object) :
         except : pass 
         return
 
-    @cache
+    # memory only: results go through this instance's logger, so they must not come from another instance
+    @cached_method(maxsize=128, ttl=600, cache_if=_succeeded)
     def fetch(self, module : Literal['search-web', 'search-summary', 'wiki', 'all'] = 'all', **kwargs) -> dict :
         """
         Query's or gathers information from different sources from the web.
@@ -184,8 +205,19 @@ class UnifiedSearchEngine(object) :
                 'web-api' : search_summary(),
                 'wiki' : search_wiki(),
             }
-    @cache
     def from_url(self, url: str, method: Literal['get', 'post'] = 'get', **kwargs) -> dict:
+        if method.lower() == 'post':
+            # posts can have side effects: always sent, never cached
+            return self._request(url, method, **kwargs)
+        return self._get(url, **kwargs)
+
+    # failed requests and 4xx/5xx replies are not cached, so a transient error is retried on the next call
+    @cached_method(maxsize=256, maxbytes=32 * 1024 * 1024, ttl=600, disk=WEB_CACHE, disk_ttl=86400,
+                   cache_if=_page_ok)
+    def _get(self, url: str, **kwargs) -> dict:
+        return self._request(url, 'get', **kwargs)
+
+    def _request(self, url: str, method: str, **kwargs) -> dict:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                         "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -0,0 +1,69 @@
+import json
+import time
+import threading
+from typing import Dict
+
+
+class JobNotifier:
+    """
+    Pushes job events to a webview window in batches.
+
+    Events are merged while they wait: a job that finished is reported once
+    with its final status, and for a streaming job only its latest cursor is
+    kept. At most one `evaluate_js` call is made per `interval` seconds:
+
+        window.<function>({"finished": {job_id: status}, "progress": {job_id: cursor}})
+    """
+
+    def __init__(self, window, interval: float = 1 / 30, function: str = "_api_jobs_notify"):
+        self.window = window
+        self.interval = interval
+        self.function = function
+        self._lock = threading.Lock()
+        self._finished: Dict[str, str] = {}
+        self._progress: Dict[str, int] = {}
+        self._dirty = threading.Event()
+        self._closed = False
+        self._last = 0.0
+        self.flushes = 0
+        self.events = 0
+        self._thread = threading.Thread(target=self._run, name="fnt-notifier", daemon=True)
+        self._thread.start()
+
+    def finished(self, job_id: str, status: str):
+        with self._lock:
+            self._finished[job_id] = status
+            self._progress.pop(job_id, None)
+            self.events += 1
+        self._dirty.set()
+
+    def progress(self, job_id: str, cursor: int):
+        with self._lock:
+            if job_id not in self._finished:
+                self._progress[job_id] = cursor
+            self.events += 1
+        self._dirty.set()
+
+    def close(self):
+        self._closed = True
+        self._dirty.set()
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            delay = self._last + self.interval - time.monotonic()
+            if delay > 0 and not self._closed:
+                time.sleep(delay)
+            with self._lock:
+                self._dirty.clear()
+                batch = {"finished": self._finished, "progress": self._progress}
+                self._finished, self._progress = {}, {}
+            self._last = time.monotonic()
+            if batch["finished"] or batch["progress"]:
+                try:
+                    self.window.evaluate_js(f"{self.function}({json.dumps(batch)})")
+                    self.flushes += 1
+                except Exception as e:
+                    print(f"[JobNotifier] Failed to push job events: {e}")
+            if self._closed:
+                return
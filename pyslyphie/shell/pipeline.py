@@ -0,0 +1,142 @@
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+REF = "$ref"
+
+
+class PipelineError(ValueError):
+    pass
+
+
+def _refs(value, found: Set[str]) -> Set[str]:
+    if isinstance(value, dict):
+        if REF in value:
+            found.add(str(value[REF]).split(".", 1)[0])
+        else:
+            for v in value.values():
+                _refs(v, found)
+    elif isinstance(value, list):
+        for v in value:
+            _refs(v, found)
+    return found
+
+
+def _follow(value, path: List[str], ref: str):
+    for part in path:
+        try:
+            if isinstance(value, (list, tuple)):
+                value = value[int(part)]
+            elif isinstance(value, dict):
+                value = value[part]
+            else:
+                raise KeyError(part)
+        except (KeyError, IndexError, ValueError):
+            raise PipelineError(f"{ref!r}: nothing at {part!r}")
+    return value
+
+
+class Pipeline:
+    """
+    A small DAG of module commands.
+
+    steps maps a step name to {"module", "command", "args", "after"?}. Anywhere
+    in args, {"$ref": "name"} is replaced by the output of step `name` once it
+    is done, and {"$ref": "name.0.url"} by a part of it (list index or dict key).
+    A step runs once every step it references (or lists in "after") is done;
+    if one of them fails, the step and everything downstream of it is skipped.
+
+    Only bookkeeping lives here; fnt submits the steps and reports back through
+    `finished`.
+    """
+
+    def __init__(self, steps: Dict[str, dict]):
+        if not isinstance(steps, dict) or not steps:
+            raise PipelineError("steps must be a non-empty object of name -> step")
+        self.steps: Dict[str, dict] = {}
+        self.deps: Dict[str, Set[str]] = {}
+        for name, step in steps.items():
+            if not isinstance(step, dict) or "module" not in step or "command" not in step:
+                raise PipelineError(f"step {name!r} needs a module and a command")
+            if "." in name:
+                raise PipelineError(f"step name {name!r} may not contain '.'")
+            args = step.get("args") or []
+            if not isinstance(args, list):
+                raise PipelineError(f"step {name!r}: args must be a list")
+            after = step.get("after") or []
+            if not isinstance(after, list):
+                raise PipelineError(f"step {name!r}: after must be a list of step names")
+            self.steps[name] = {"module": step["module"], "command": step["command"], "args": args}
+            self.deps[name] = _refs(args, set()) | set(after)
+            unknown = self.deps[name] - set(steps)
+            if unknown:
+                raise PipelineError(f"step {name!r} depends on unknown step(s): {', '.join(sorted(unknown))}")
+        self._check_acyclic()
+
+        self.lock = threading.Lock()
+        self.state: Dict[str, str] = {name: "waiting" for name in self.steps}  # waiting, submitted, done, failed, skipped
+        self.jobs: Dict[str, str] = {}
+        self.outputs: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.cancelled = False
+
+    def _check_acyclic(self):
+        seen: Dict[str, int] = {}  # 1 = on the current path, 2 = finished
+
+        def visit(name, path):
+            if seen.get(name) == 2:
+                return
+            if seen.get(name) == 1:
+                raise PipelineError("steps form a cycle: " + " -> ".join(path + [name]))
+            seen[name] = 1
+            for dep in self.deps[name]:
+                visit(dep, path + [name])
+            seen[name] = 2
+
+        for name in self.steps:
+            visit(name, [])
+
+    # called with self.lock held
+
+    def take_ready(self) -> List[str]:
+        """Steps whose inputs are all done; they are marked submitted."""
+        ready = [name for name, state in self.state.items()
+                 if state == "waiting" and all(self.state[d] == "done" for d in self.deps[name])]
+        for name in ready:
+            self.state[name] = "submitted"
+        return ready
+
+    def args(self, name: str) -> list:
+        def sub(value):
+            if isinstance(value, dict):
+                if REF in value:
+                    ref = str(value[REF])
+                    step, *path = ref.split(".")
+                    return _follow(self.outputs[step], path, ref)
+                return {k: sub(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [sub(v) for v in value]
+            return value
+        return sub(self.steps[name]["args"])
+
+    def finished(self, name: str, ok: bool, out=None, error: Optional[str] = None):
+        if ok:
+            self.state[name] = "done"
+            self.outputs[name] = out
+            return
+        self.state[name] = "failed"
+        self.errors[name] = error or "step failed"
+        self.skip(lambda step: name in self.deps[step], f"upstream step {name!r} failed")
+
+    def skip(self, match, reason: str):
+        """Skip waiting steps that match, and everything downstream of them."""
+        changed = True
+        while changed:
+            changed = False
+            for step, state in self.state.items():
+                if state == "waiting" and (match(step) or any(self.state[d] == "skipped" for d in self.deps[step])):
+                    self.state[step] = "skipped"
+                    self.errors.setdefault(step, reason)
+                    changed = True
+
+    def pending(self) -> bool:
+        return any(state in ("waiting", "submitted") for state in self.state.values())
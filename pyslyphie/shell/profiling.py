@@ -0,0 +1,157 @@
+import io
+import json
+import time
+import heapq
+import random
+import threading
+import itertools
+from typing import Dict, Optional
+
+from .metrics import FINE_BOUNDS, Histogram
+
+
+class _Timings:
+    __slots__ = ("histogram", "min_ns", "slowest")
+
+    def __init__(self):
+        self.histogram = Histogram(FINE_BOUNDS)
+        self.min_ns: Optional[int] = None
+        self.slowest: list = []  # min-heap of (ns, seq, capture) for the slowest sampled calls
+
+
+class Profiler:
+    """
+    Call timings per function name, cheap enough to leave on.
+
+    Every call costs two perf_counter_ns reads and a histogram update under a
+    lock. With `sample_rate` > 0 that fraction of calls also runs under
+    cProfile (and tracemalloc, with `memory=True`); for each function only
+    the `keep_slowest` slowest sampled calls keep their capture. Only one call
+    is captured at a time in the process, others just go untraced meanwhile.
+    """
+
+    def __init__(self, enabled: bool = True, sample_rate: float = 0.0, keep_slowest: int = 5,
+                 memory: bool = False, top: int = 15):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.keep_slowest = keep_slowest
+        self.memory = memory
+        self.top = top
+        self._lock = threading.Lock()
+        self._capturing = threading.Lock()
+        self._seq = itertools.count()
+        self._timings: Dict[str, _Timings] = {}
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                  keep_slowest: Optional[int] = None, memory: Optional[bool] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        if keep_slowest is not None:
+            self.keep_slowest = max(0, int(keep_slowest))
+        if memory is not None:
+            self.memory = memory
+
+    def record(self, name: str, ns: int, capture: Optional[dict] = None):
+        with self._lock:
+            t = self._timings.get(name)
+            if t is None:
+                t = self._timings[name] = _Timings()
+            t.histogram.add(ns / 1e9)
+            if t.min_ns is None or ns < t.min_ns:
+                t.min_ns = ns
+            if capture is not None and self.keep_slowest:
+                item = (ns, next(self._seq), capture)
+                if len(t.slowest) < self.keep_slowest:
+                    heapq.heappush(t.slowest, item)
+                elif ns > t.slowest[0][0]:
+                    heapq.heapreplace(t.slowest, item)
+
+    def _would_keep(self, name: str, ns: int) -> bool:
+        with self._lock:
+            t = self._timings.get(name)
+            return t is None or len(t.slowest) < self.keep_slowest or ns > t.slowest[0][0]
+
+    def call(self, name: str, func, args, kwargs):
+        if not self.enabled:
+            return func(*args, **kwargs)
+        if self.sample_rate and random.random() < self.sample_rate and self._capturing.acquire(blocking=False):
+            try:
+                return self._captured(name, func, args, kwargs)
+            finally:
+                self._capturing.release()
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def _captured(self, name: str, func, args, kwargs):
+        import cProfile
+        import pstats
+        import tracemalloc
+
+        prof = cProfile.Profile()
+        tracing = False
+        if self.memory:
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        try:
+            prof.enable()
+            profiling = True
+        except ValueError:  # another profiler is active in this thread
+            profiling = False
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            ns = time.perf_counter_ns() - start
+            if profiling:
+                prof.disable()
+            capture = None
+            if self._would_keep(name, ns):
+                capture = {"seconds": ns / 1e9, "at": time.time()}
+                if profiling:
+                    out = io.StringIO()
+                    pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(self.top)
+                    capture["profile"] = out.getvalue()
+                if self.memory:
+                    current, peak = tracemalloc.get_traced_memory()
+                    stats = tracemalloc.take_snapshot().statistics("lineno")[:self.top]
+                    capture["memory"] = {"peak_bytes": peak, "current_bytes": current,
+                                         "top": [str(s) for s in stats]}
+            if tracing:
+                tracemalloc.stop()
+            self.record(name, ns, capture)
+
+    def snapshot(self, captures: bool = False) -> dict:
+        """Per function: count and latency summary in seconds; with captures, the slowest sampled calls."""
+        with self._lock:
+            out = {}
+            for name, t in sorted(self._timings.items()):
+                entry = t.histogram.summary()
+                entry["min"] = t.min_ns / 1e9 if t.min_ns is not None else None
+                entry["total"] = t.histogram.total
+                if captures:
+                    entry["slowest"] = [c for _, _, c in sorted(t.slowest, reverse=True)]
+                out[name] = entry
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}
+
+    def dump(self, path: Optional[str] = None, captures: bool = True) -> str:
+        """The snapshot as JSON, written to path when given."""
+        text = json.dumps({"created": time.time(), "functions": self.snapshot(captures=captures)}, indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+
+PROFILER = Profiler()
+
@@ -1,22 +1,81 @@
+import io
 import os
+import re
 import json
 import time
-from typing import Dict, Union
+import struct
+import bisect
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+
+CHUNK_SIZE = 1 << 20
+
+
+def _chunks(src, size: int) -> Iterator[bytes]:
+    """src, a readable file object or a bytes-like buffer, in pieces of at most size bytes."""
+    if hasattr(src, "read"):
+        while True:
+            chunk = src.read(size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        view = memoryview(src).cast("B")
+        for i in range(0, len(view), size):
+            yield view[i:i + size]
 
 
 class SimpleEncryptor:
+    """
+    Repeating-key XOR. Byte i of a stream is XORed with key[i % len(key)], so any
+    range can be processed on its own given its offset. Blocks are XORed as one
+    big integer against a key pad built once, not byte by byte.
+    """
+
     def __init__(self, key: str):
         self.key = key.encode()
+        self._pad = b""
+
+    def _keystream(self, offset: int, size: int) -> bytes:
+        n = len(self.key)
+        if len(self._pad) < size + n:
+            self._pad = self.key * (max(size, PAGE_SIZE) // n + 2)
+        shift = offset % n
+        return self._pad[shift:shift + size]
+
+    def xor(self, data: bytes, offset: int = 0) -> bytes:
+        """data XORed with the key stream from position `offset` on; encrypts and decrypts."""
+        size = len(data)
+        if size > CHUNK_SIZE:
+            return b"".join(self.xor(chunk, offset + i * CHUNK_SIZE) for i, chunk in enumerate(_chunks(data, CHUNK_SIZE)))
+        if not size:
+            return b""
+        stream = int.from_bytes(self._keystream(offset, size), "little")
+        return (int.from_bytes(data, "little") ^ stream).to_bytes(size, "little")
+
+    def encrypt_stream(self, src, dst=None, offset: int = 0, chunk_size: int = CHUNK_SIZE):
+        """
+        XOR src into dst chunk by chunk, as raw bytes, with the key stream starting
+        at `offset`. src is a readable file object or a bytes-like buffer, dst a
+        writable file object. Returns the number of bytes written, or the bytes
+        themselves when dst is None.
+        """
+        out = io.BytesIO() if dst is None else dst
+        total = 0
+        for chunk in _chunks(src, chunk_size):
+            out.write(self.xor(chunk, offset + total))
+            total += len(chunk)
+        return out.getvalue() if dst is None else total
+
+    def decrypt_stream(self, src, dst=None, offset: int = 0, chunk_size: int = CHUNK_SIZE):
+        return self.encrypt_stream(src, dst, offset, chunk_size)
 
     def encrypt(self, data: str) -> str:
-        data_bytes = data.encode()
-        enc = bytes([b ^ self.key[i % len(self.key)] for i, b in enumerate(data_bytes)])
-        return enc.hex()
-    
+        return self.xor(data.encode()).hex()
+
     def decrypt(self, hex_str: str) -> str:
-        data_bytes = bytes.fromhex(hex_str)
-        dec = bytes([b ^ self.key[i % len(self.key)] for i, b in enumerate(data_bytes)])
-        return dec.decode(errors="ignore")
+        return self.xor(bytes.fromhex(hex_str)).decode(errors="ignore")
 
 
 
@@ -45,125 +104,792 @@ class VirtualDisk:
 
 
 
+# On-disk layout, in PAGE_SIZE pages:
+#   page 0            superblock
+#   pages 1..n        free-space bitmap, one bit per page of the image
+#   inode table       fixed-size inode slots, found through a two-level radix of
+#                     page pointers, so inode n is 3 page reads away at most
+#   directory tree    one B+tree keyed by (parent inode, name) -> inode, shared by
+#                     every directory; list_dir is a range scan over one parent
+#   file data         raw encrypted blocks, one page each, mapped by extents
+#                     (file block, first page, pages); the first few are kept in
+#                     the inode, the rest in a chain of extent pages
+# Every operation reads and rewrites only the pages it touches. Files are
+# sparse: blocks are allocated when written, holes read back as zeros.
+PAGE_SIZE = 4096
+BITS_PER_PAGE = PAGE_SIZE * 8
+MAGIC = b"SLYFS\x00\x03\x00"
+VERSION = 3
+ROOT_INO = 1
+DIR, FILE = 2, 1
+MAX_NAME = 255
+
+_SUPER = struct.Struct("<8sIIIIIIII")  # magic, version, page_size, pages, bitmap_pages, itable_root, tree_root, next_ino, free_ino
+_INODE = struct.Struct("<BB10s2xdddQIIII")  # kind, _, permissions, created, modified, accessed, size, parent, next_free, extents, extent page
+_EXTENT = struct.Struct("<III")  # file block, first page, pages
+INODE_SIZE = 128
+INLINE_EXTENTS = 4
+INODES_PER_PAGE = PAGE_SIZE // INODE_SIZE
+PTRS_PER_PAGE = PAGE_SIZE // 4
+MAX_INODES = PTRS_PER_PAGE * PTRS_PER_PAGE * INODES_PER_PAGE
+
+_NODE = struct.Struct("<BHI")  # kind (1 leaf, 2 internal), count, next leaf / first child
+_KEY = struct.Struct("<IB")    # parent inode, name length; name bytes follow
+_PTR = struct.Struct("<I")
+_EXTENT_PAGE = struct.Struct("<IH")  # next extent page, extents in this page
+EXTENTS_PER_PAGE = (PAGE_SIZE - _EXTENT_PAGE.size) // _EXTENT.size
+LEAF, INTERNAL = 1, 2
+
+_NOT_FULL = re.compile(b"[^\xff]")
+_NOT_EMPTY = re.compile(b"[^\x00]")
+
+
+class _Pager:
+    """Page I/O with a small LRU page cache, the free-space bitmap and the superblock."""
+
+    def __init__(self, disk: VirtualDisk, cache_pages: int = 4096):
+        self.disk = disk
+        self.cache_pages = cache_pages
+        self._cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self.reset(disk.size_bytes // PAGE_SIZE)
+
+    def reset(self, pages: int):
+        self._cache.clear()
+        self.pages = pages
+        self.bitmap_pages = -(-pages // BITS_PER_PAGE)
+        self.bitmap = bytearray(self.bitmap_pages * PAGE_SIZE)
+        self.used = 0
+        self._dirty = set()
+        self._cursor = 0
+        self.itable_root = 0
+        self.tree_root = 0
+        self.next_ino = ROOT_INO
+        self.free_ino = 0
+        self._mark(0, 1 + self.bitmap_pages, True)  # the superblock and the bitmap itself
+
+    def load_super(self, raw: bytes):
+        magic, version, page_size, pages, bitmap_pages, self.itable_root, self.tree_root, \
+            self.next_ino, self.free_ino = _SUPER.unpack_from(raw)
+        if version != VERSION or page_size != PAGE_SIZE:
+            raise ValueError(f"Unsupported filesystem version {version} / page size {page_size}")
+        self._cache.clear()
+        self.pages, self.bitmap_pages = pages, bitmap_pages
+        size = bitmap_pages * PAGE_SIZE
+        self.bitmap = bytearray(self.disk.read_data(PAGE_SIZE, size).ljust(size, b"\x00"))
+        self.used = bin(int.from_bytes(self.bitmap, "little")).count("1")
+        self._dirty = set()
+        self._cursor = 0
+
+    def save_super(self):
+        self.write(0, _SUPER.pack(MAGIC, VERSION, PAGE_SIZE, self.pages, self.bitmap_pages,
+                                  self.itable_root, self.tree_root, self.next_ino, self.free_ino))
+
+    def read(self, n: int) -> bytes:
+        page = self._cache.get(n)
+        if page is None:
+            page = self.disk.read_data(n * PAGE_SIZE, PAGE_SIZE).ljust(PAGE_SIZE, b"\x00")
+            self._cache[n] = page
+            if len(self._cache) > self.cache_pages:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(n)
+        return page
+
+    def write(self, n: int, data: bytes, offset: int = 0):
+        if offset or len(data) < PAGE_SIZE:
+            page = bytearray(self.read(n))
+            page[offset:offset + len(data)] = data
+            data = bytes(page)
+        self.disk.write_data(n * PAGE_SIZE, data)
+        self._cache[n] = data
+        self._cache.move_to_end(n)
+
+    def _used(self, n: int) -> bool:
+        return bool(self.bitmap[n >> 3] >> (n & 7) & 1)
+
+    def _mark(self, start: int, count: int, used: bool):
+        bitmap, end, pos = self.bitmap, start + count, start
+        while pos < end:
+            if pos & 7 == 0 and end - pos >= 8:
+                full = (end - pos) >> 3
+                bitmap[pos >> 3:(pos >> 3) + full] = (b"\xff" if used else b"\x00") * full
+                pos += full << 3
+            elif used:
+                bitmap[pos >> 3] |= 1 << (pos & 7)
+                pos += 1
+            else:
+                bitmap[pos >> 3] &= ~(1 << (pos & 7)) & 0xFF
+                pos += 1
+        self.used += count if used else -count
+        self._dirty.update(range(start // BITS_PER_PAGE, (end - 1) // BITS_PER_PAGE + 1))
+
+    def flush_bitmap(self):
+        for n in sorted(self._dirty):
+            self.disk.write_data((1 + n) * PAGE_SIZE, bytes(self.bitmap[n * PAGE_SIZE:(n + 1) * PAGE_SIZE]))
+        self._dirty.clear()
+
+    def _find_free(self, pos: int) -> Optional[int]:
+        while pos < self.pages:
+            if pos & 7 == 0:
+                m = _NOT_FULL.search(self.bitmap, pos >> 3)
+                if m is None:
+                    return None
+                pos = max(pos, m.start() << 3)
+                if pos >= self.pages:
+                    return None
+            if not self._used(pos):
+                return pos
+            pos += 1
+        return None
+
+    def _free_until(self, pos: int, limit: int) -> int:
+        while pos < limit:
+            if pos & 7 == 0:
+                m = _NOT_EMPTY.search(self.bitmap, pos >> 3, (limit + 7) >> 3)
+                skip = min(m.start() << 3 if m else limit, limit)
+                if skip > pos:
+                    pos = skip
+                    continue
+            if self._used(pos):
+                return pos
+            pos += 1
+        return limit
+
+    def alloc_extent(self, count: int, goal: int = 0) -> Tuple[int, int]:
+        """Up to `count` contiguous free pages, at or after `goal` if possible: (first page, pages)."""
+        start = self._find_free(goal or self._cursor)
+        if start is None:
+            start = self._find_free(0)
+        if start is None:
+            raise OSError("Virtual disk is full")
+        end = self._free_until(start, min(start + count, self.pages))
+        self._mark(start, end - start, True)
+        self.flush_bitmap()
+        self._cursor = end
+        return start, end - start
+
+    def alloc(self) -> int:
+        """A zeroed page."""
+        n, _ = self.alloc_extent(1)
+        self.write(n, bytes(PAGE_SIZE))
+        return n
+
+    def free(self, start: int, count: int = 1):
+        cached = range(start, start + count) if count < 64 else [n for n in self._cache if start <= n < start + count]
+        for n in cached:
+            self._cache.pop(n, None)
+        self._mark(start, count, False)
+        self.flush_bitmap()
+
+
+class _InodeTable:
+    """Fixed-size inode slots, addressed by inode number through a two-level radix of page pointers."""
+
+    def __init__(self, pager: _Pager):
+        self.pager = pager
+
+    def _locate(self, ino: int, create: bool = False) -> Tuple[int, int]:
+        if not 0 < ino < MAX_INODES:
+            raise ValueError(f"Bad inode number {ino}")
+        index, slot = divmod(ino, INODES_PER_PAGE)
+        page = self.pager.itable_root
+        for ptr in divmod(index, PTRS_PER_PAGE):
+            child = _PTR.unpack_from(self.pager.read(page), ptr * 4)[0]
+            if not child:
+                if not create:
+                    raise FileNotFoundError(f"inode {ino}")
+                child = self.pager.alloc()
+                self.pager.write(page, _PTR.pack(child), ptr * 4)
+            page = child
+        return page, slot * INODE_SIZE
+
+    def get(self, ino: int) -> dict:
+        page, offset = self._locate(ino)
+        raw = self.pager.read(page)
+        kind, _, perms, created, modified, accessed, size, parent, next_free, count, overflow = \
+            _INODE.unpack_from(raw, offset)
+        if kind not in (DIR, FILE):
+            raise FileNotFoundError(f"inode {ino}")
+        extents = [_EXTENT.unpack_from(raw, offset + _INODE.size + i * _EXTENT.size)
+                   for i in range(min(count, INLINE_EXTENTS))]
+        page = overflow
+        while page:
+            chunk = self.pager.read(page)
+            page, n = _EXTENT_PAGE.unpack_from(chunk)
+            extents.extend(_EXTENT.unpack_from(chunk, _EXTENT_PAGE.size + i * _EXTENT.size) for i in range(n))
+        return {
+            "type": "dir" if kind == DIR else "file",
+            "permissions": perms.rstrip(b"\x00").decode(),
+            "timestamps": {"created": created, "modified": modified, "accessed": accessed},
+            "size": size, "parent": parent, "extents": extents, "overflow": overflow,
+        }
+
+    def put(self, ino: int, node: dict):
+        """Write the inode slot; extents past the inline ones must already be saved with set_extents."""
+        page, offset = self._locate(ino, create=True)
+        ts, extents = node["timestamps"], node.get("extents", [])
+        raw = _INODE.pack(
+            DIR if node["type"] == "dir" else FILE, 0, node["permissions"].encode()[:10],
+            ts["created"], ts["modified"], ts["accessed"], node.get("size", 0), node.get("parent", 0), 0,
+            len(extents), node.get("overflow", 0),
+        ) + b"".join(_EXTENT.pack(*e) for e in extents[:INLINE_EXTENTS])
+        self.pager.write(page, raw, offset)
+
+    def set_extents(self, node: dict, extents: list):
+        """Store the extent list of a node, reusing its extent pages; the caller then puts the node."""
+        pages, page = [], node.get("overflow", 0)
+        while page:
+            pages.append(page)
+            page = _EXTENT_PAGE.unpack_from(self.pager.read(page))[0]
+        rest = extents[INLINE_EXTENTS:]
+        need = -(-len(rest) // EXTENTS_PER_PAGE)
+        while len(pages) > need:
+            self.pager.free(pages.pop())
+        fresh = []
+        try:
+            while len(pages) < need:
+                fresh.append(self.pager.alloc())
+                pages.append(fresh[-1])
+        except OSError:
+            for page in fresh:
+                self.pager.free(page)
+            raise
+        for i, page in enumerate(pages):
+            chunk = rest[i * EXTENTS_PER_PAGE:(i + 1) * EXTENTS_PER_PAGE]
+            nxt = pages[i + 1] if i + 1 < len(pages) else 0
+            self.pager.write(page, _EXTENT_PAGE.pack(nxt, len(chunk)) + b"".join(_EXTENT.pack(*e) for e in chunk))
+        node["extents"] = extents
+        node["overflow"] = pages[0] if pages else 0
+
+    def alloc(self) -> int:
+        if self.pager.free_ino:
+            ino = self.pager.free_ino
+            page, offset = self._locate(ino)
+            self.pager.free_ino = _INODE.unpack_from(self.pager.read(page), offset)[8]
+        else:
+            ino = self.pager.next_ino
+            if ino >= MAX_INODES:
+                raise OSError("Out of inodes")
+            self.pager.next_ino += 1
+        self.pager.save_super()
+        return ino
+
+    def release(self, ino: int):
+        page, offset = self._locate(ino)
+        self.pager.write(page, _INODE.pack(0, 0, b"", 0, 0, 0, 0, 0, self.pager.free_ino, 0, 0)
+                         .ljust(INODE_SIZE, b"\x00"), offset)
+        self.pager.free_ino = ino
+        self.pager.save_super()
+
+
+class _DirTree:
+    """
+    B+tree of directory entries, (parent inode, name) -> inode, one node per page.
+    Nodes split when their entries no longer fit a page; removal does not merge
+    nodes, so the height only ever follows the largest size the tree reached.
+    """
+
+    def __init__(self, pager: _Pager):
+        self.pager = pager
+
+    def _load(self, n: int):
+        raw = self.pager.read(n)
+        kind, count, link = _NODE.unpack_from(raw)
+        pos = _NODE.size
+        keys, ptrs = [], []
+        for _ in range(count):
+            parent, length = _KEY.unpack_from(raw, pos)
+            pos += _KEY.size
+            keys.append((parent, raw[pos:pos + length]))
+            pos += length
+            ptrs.append(_PTR.unpack_from(raw, pos)[0])
+            pos += 4
+        if kind == INTERNAL:
+            ptrs.insert(0, link)  # children; keys[i] is the smallest key under ptrs[i + 1]
+        return kind, keys, ptrs, link
+
+    @staticmethod
+    def _size(keys) -> int:
+        return _NODE.size + sum(_KEY.size + len(name) + 4 for _, name in keys)
+
+    def _store(self, n: int, kind: int, keys, ptrs, link: int):
+        out = bytearray(_NODE.pack(kind, len(keys), ptrs[0] if kind == INTERNAL else link))
+        for (parent, name), ptr in zip(keys, ptrs[1:] if kind == INTERNAL else ptrs):
+            out += _KEY.pack(parent, len(name)) + name + _PTR.pack(ptr)
+        assert len(out) <= PAGE_SIZE, f"directory node of {len(out)} bytes does not fit a page"
+        self.pager.write(n, bytes(out))
+
+    def _leaf(self, key) -> int:
+        n = self.pager.tree_root
+        while True:
+            kind, keys, ptrs, _ = self._load(n)
+            if kind == LEAF:
+                return n
+            n = ptrs[bisect.bisect_right(keys, key)]
+
+    def get(self, key) -> Optional[int]:
+        _, keys, ptrs, _ = self._load(self._leaf(key))
+        i = bisect.bisect_left(keys, key)
+        return ptrs[i] if i < len(keys) and keys[i] == key else None
+
+    def insert(self, key, ino: int):
+        split = self._insert(self.pager.tree_root, key, ino)
+        if split is not None:
+            sep, right = split
+            root = self.pager.alloc()
+            self._store(root, INTERNAL, [sep], [self.pager.tree_root, right], 0)
+            self.pager.tree_root = root
+            self.pager.save_super()
+
+    def _insert(self, n: int, key, ino: int):
+        kind, keys, ptrs, link = self._load(n)
+        if kind == LEAF:
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                ptrs[i] = ino
+                self._store(n, kind, keys, ptrs, link)
+                return None
+            keys.insert(i, key)
+            ptrs.insert(i, ino)
+        else:
+            i = bisect.bisect_right(keys, key)
+            split = self._insert(ptrs[i], key, ino)
+            if split is None:
+                return None
+            keys.insert(i, split[0])
+            ptrs.insert(i + 1, split[1])
+        if self._size(keys) <= PAGE_SIZE:
+            self._store(n, kind, keys, ptrs, link)
+            return None
+
+        # split where the bytes, not the entries, are halved: names vary in length
+        half, acc, mid = self._size(keys) // 2, _NODE.size, 0
+        while mid < len(keys) - 2 and acc + _KEY.size + len(keys[mid][1]) + 4 <= half:
+            acc += _KEY.size + len(keys[mid][1]) + 4
+            mid += 1
+        mid = max(mid, 1)
+        right = self.pager.alloc()
+        if kind == LEAF:
+            self._store(right, LEAF, keys[mid:], ptrs[mid:], link)
+            self._store(n, LEAF, keys[:mid], ptrs[:mid], right)
+            return keys[mid], right
+        self._store(right, INTERNAL, keys[mid + 1:], ptrs[mid + 1:], 0)
+        self._store(n, INTERNAL, keys[:mid], ptrs[:mid + 1], 0)
+        return keys[mid], right
+
+    def remove(self, key) -> bool:
+        n = self._leaf(key)
+        kind, keys, ptrs, link = self._load(n)
+        i = bisect.bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return False
+        del keys[i], ptrs[i]
+        self._store(n, kind, keys, ptrs, link)
+        return True
+
+    def scan(self, parent: int) -> Iterator[Tuple[str, int]]:
+        start = (parent, b"")
+        n = self._leaf(start)
+        while n:
+            _, keys, ptrs, link = self._load(n)
+            for i in range(bisect.bisect_left(keys, start), len(keys)):
+                if keys[i][0] != parent:
+                    return
+                yield keys[i][1].decode("utf-8", errors="surrogateescape"), ptrs[i]
+            n = link
+
+
+
+
 class VirtualFileSystem:
     def __init__(self, disk: VirtualDisk, encryption_key: str = "default_key"):
         self.disk = disk
-        self.fs_tree: Dict[str, Union[dict, str]] = {"type": "dir", "children": {}}
-        self.meta_offset = 0
-        self.data_offset = 4096
         self.encryptor = SimpleEncryptor(encryption_key)
+        self.pager = _Pager(disk)
+        self.inodes = _InodeTable(self.pager)
+        self.tree = _DirTree(self.pager)
         self.load_filesystem()
 
     def load_filesystem(self):
-        self.disk.file.seek(self.meta_offset)
-        raw = self.disk.file.read(8192).strip(b"\x00")
+        head = self.disk.read_data(0, PAGE_SIZE)
+        if head[:6] == MAGIC[:6]:
+            self.pager.load_super(head)  # raises for a version this code cannot read
+            print("[~] Loaded existing filesystem.")
+            return
+        # format 1 kept the whole tree as JSON in the first 8 KB; anything else is
+        # refused rather than formatted over
+        legacy = None
+        raw = self.disk.read_data(0, 8192).strip(b"\x00")
         if raw:
             try:
-                self.fs_tree = json.loads(raw.decode())
-                print("[~] Loaded existing filesystem tree.")
+                legacy = json.loads(raw.decode())
             except Exception:
-                print("[!] Corrupted FS tree, resetting.")
+                legacy = None
+            if not isinstance(legacy, dict):
+                print("[!] Unrecognized FS header, leaving the image untouched.")
+                raise ValueError(f"{self.disk.path} does not hold a readable filesystem")
+        self._format()
+        if legacy:
+            self._import(ROOT_INO, legacy)
+            print("[~] Converted legacy filesystem tree.")
         else:
             print("[+] New filesystem initialized.")
-            self.save_filesystem()
+
+    def _format(self):
+        self.pager.reset(self.disk.size_bytes // PAGE_SIZE)
+        self.pager.flush_bitmap()
+        self.pager.save_super()
+        self.pager.itable_root = self.pager.alloc()
+        self.pager.tree_root = self.pager.alloc()
+        self.tree._store(self.pager.tree_root, LEAF, [], [], 0)
+        self.pager.save_super()
+        root = self.inodes.alloc()
+        self.inodes.put(root, self._new_node("dir", "rwxr-xr-x", 0))
+
+    def _import(self, parent: int, tree: dict):
+        for name, child in tree.get("children", {}).items():
+            node = self._new_node(child.get("type", "dir"), child.get("permissions", "rwxr-xr-x"), parent)
+            node["timestamps"].update(child.get("timestamps", {}))
+            ino = self.inodes.alloc()
+            if node["type"] == "file":
+                # format 1 stored the same key stream from offset 0, hex encoded
+                self._write_range(node, 0, self.encryptor.xor(bytes.fromhex(child.get("data", ""))))
+            self.inodes.put(ino, node)
+            self.tree.insert(self._key(parent, name), ino)
+            if node["type"] == "dir":
+                self._import(ino, child)
 
     def save_filesystem(self):
-        data = json.dumps(self.fs_tree).encode()
-        if len(data) > 8192:
-            raise ValueError("FS metadata too large!")
-        self.disk.write_data(self.meta_offset, data.ljust(8192, b"\x00"))
-
-    def _get_node(self, path: str):
-        parts = [p for p in path.strip("/").split("/") if p]
-        node = self.fs_tree
-        for part in parts:
-            if part not in node["children"]:
+        # pages are written as they change; this only pushes them to the image file
+        self.disk.file.flush()
+
+    @staticmethod
+    def _new_node(kind: str, permissions: str, parent: int) -> dict:
+        now = time.time()
+        return {"type": kind, "permissions": permissions, "size": 0, "parent": parent, "extents": [],
+                "overflow": 0, "timestamps": {"created": now, "modified": now, "accessed": now}}
+
+    @staticmethod
+    def _parts(path: str) -> List[str]:
+        return [p for p in path.strip("/").split("/") if p]
+
+    @staticmethod
+    def _key(parent: int, name: str):
+        raw = name.encode("utf-8", errors="surrogateescape")
+        if len(raw) > MAX_NAME:
+            raise ValueError(f"Name too long: {name[:32]}...")
+        return parent, raw
+
+    def _lookup(self, path: str, parts: Optional[List[str]] = None) -> int:
+        ino = ROOT_INO
+        for part in self._parts(path) if parts is None else parts:
+            child = self.tree.get(self._key(ino, part))
+            if child is None:
                 raise FileNotFoundError(path)
-            node = node["children"][part]
-        return node
+            ino = child
+        return ino
+
+    def _get_node(self, path: str) -> dict:
+        return self.inodes.get(self._lookup(path))
+
+    def _get_file(self, path: str) -> Tuple[int, dict]:
+        ino = self._lookup(path)
+        node = self.inodes.get(ino)
+        if node["type"] != "file":
+            raise IsADirectoryError(path)
+        return ino, node
 
     def _update_timestamp(self, node: dict, mode="modified"):
         node["timestamps"][mode] = time.time()
 
-    def mkdir(self, path: str, permissions: str = "rwxr-xr-x"):
-        parts = [p for p in path.strip("/").split("/") if p]
-        node = self.fs_tree
+    def _ensure_dirs(self, path: str, parts: List[str], permissions: str = "rwxr-xr-x") -> int:
+        ino = ROOT_INO
         for part in parts:
-            if part not in node["children"]:
-                node["children"][part] = {
-                    "type": "dir",
-                    "children": {},
-                    "permissions": permissions,
-                    "timestamps": {
-                        "created": time.time(),
-                        "modified": time.time(),
-                        "accessed": time.time()
-                    }
-                }
-            node = node["children"][part]
-        self.save_filesystem()
+            key = self._key(ino, part)
+            child = self.tree.get(key)
+            if child is None:
+                child = self.inodes.alloc()
+                self.inodes.put(child, self._new_node("dir", permissions, ino))
+                self.tree.insert(key, child)
+            elif self.inodes.get(child)["type"] != "dir":
+                raise NotADirectoryError(path)
+            ino = child
+        return ino
+
+    def _open(self, path: str, permissions: str) -> Tuple[int, dict]:
+        """The file at path, created empty if missing."""
+        parts = self._parts(path)
+        if not parts:
+            raise IsADirectoryError(path)
+        parent = self._ensure_dirs(path, parts[:-1])
+        key = self._key(parent, parts[-1])
+        ino = self.tree.get(key)
+        if ino is None:
+            ino = self.inodes.alloc()
+            node = self._new_node("file", permissions, parent)
+            self.inodes.put(ino, node)
+            self.tree.insert(key, ino)
+            return ino, node
+        node = self.inodes.get(ino)
+        if node["type"] != "file":
+            raise IsADirectoryError(path)
+        return ino, node
+
+    # file data
+
+    def _segments(self, node: dict, first: int, count: int, allocate: bool = False) -> List[Tuple[int, Optional[int], int]]:
+        """(file block, first page or None for a hole, blocks) runs covering blocks [first, first + count)."""
+        extents = node["extents"]
+        out, added = [], []
+        block, end = first, first + count
+        i = max(bisect.bisect_right(extents, (block, float("inf"))) - 1, 0)
+        while block < end:
+            while i < len(extents) and extents[i][0] + extents[i][2] <= block:
+                i += 1
+            if i < len(extents) and extents[i][0] <= block:
+                fb, page, n = extents[i]
+                n = min(end, fb + n) - block
+                out.append((block, page + block - fb, n))
+                block += n
+                continue
+            n = (min(end, extents[i][0]) if i < len(extents) else end) - block
+            if not allocate:
+                out.append((block, None, n))
+                block += n
+                continue
+            prev = out[-1] if out and out[-1][1] is not None else extents[i - 1] if 0 < i <= len(extents) else None
+            goal = prev[1] + prev[2] if prev else 0
+            try:
+                while n:
+                    page, got = self.pager.alloc_extent(n, goal)
+                    out.append((block, page, got))
+                    added.append((block, page, got))
+                    block, n, goal = block + got, n - got, page + got
+            except OSError:
+                self._free_extents(added)
+                raise
+        if added:
+            try:
+                self.inodes.set_extents(node, self._merge(extents + added))
+            except OSError:
+                self._free_extents(added)
+                raise
+        return out
+
+    def _free_extents(self, extents: list):
+        # give back blocks that were allocated but never made it into a file
+        for _, page, n in extents:
+            self.pager.free(page, n)
+
+    @staticmethod
+    def _merge(extents: list) -> list:
+        merged = []
+        for fb, page, n in sorted(extents):
+            if merged and merged[-1][0] + merged[-1][2] == fb and merged[-1][1] + merged[-1][2] == page:
+                merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + n)
+            else:
+                merged.append((fb, page, n))
+        return merged
+
+    def _read_range(self, node: dict, offset: int, size: int) -> bytes:
+        size = min(size, node["size"] - offset)
+        if size <= 0:
+            return b""
+        first, last = offset // PAGE_SIZE, (offset + size - 1) // PAGE_SIZE
+        out = bytearray()
+        for block, page, n in self._segments(node, first, last - first + 1):
+            if page is None:
+                out += bytes(n * PAGE_SIZE)
+            else:
+                raw = self.disk.read_data(page * PAGE_SIZE, n * PAGE_SIZE).ljust(n * PAGE_SIZE, b"\x00")
+                out += self.encryptor.xor(raw, block * PAGE_SIZE)
+        skip = offset - first * PAGE_SIZE
+        return bytes(out[skip:skip + size])
+
+    def _write_range(self, node: dict, offset: int, data: bytes):
+        if not data:
+            return
+        end = offset + len(data)
+        first, last = offset // PAGE_SIZE, (end - 1) // PAGE_SIZE
+        buf = bytearray((last - first + 1) * PAGE_SIZE)
+        # blocks only partly covered by data keep the rest of their old contents
+        for block, partial in ((first, offset % PAGE_SIZE), (last, end % PAGE_SIZE)):
+            if partial:
+                old = self._read_range(node, block * PAGE_SIZE, PAGE_SIZE)
+                at = (block - first) * PAGE_SIZE
+                buf[at:at + len(old)] = old
+        buf[offset - first * PAGE_SIZE:end - first * PAGE_SIZE] = data
+        cipher = self.encryptor.xor(bytes(buf), first * PAGE_SIZE)
+        for block, page, n in self._segments(node, first, last - first + 1, allocate=True):
+            at = (block - first) * PAGE_SIZE
+            self.disk.write_data(page * PAGE_SIZE, cipher[at:at + n * PAGE_SIZE])
+        node["size"] = max(node["size"], end)
+
+    def _truncate(self, node: dict, size: int):
+        if size < node["size"]:
+            tail = size % PAGE_SIZE
+            if tail and self._segments(node, size // PAGE_SIZE, 1)[0][1] is not None:
+                self._write_range(node, size, bytes(PAGE_SIZE - tail))
+            keep, extents = -(-size // PAGE_SIZE), []
+            for fb, page, n in node["extents"]:
+                if fb + n <= keep:
+                    extents.append((fb, page, n))
+                    continue
+                cut = max(keep - fb, 0)
+                self.pager.free(page + cut, n - cut)
+                if cut:
+                    extents.append((fb, page, cut))
+            self.inodes.set_extents(node, extents)
+        node["size"] = size
+
+    def mkdir(self, path: str, permissions: str = "rwxr-xr-x"):
+        self._ensure_dirs(path, self._parts(path), permissions)
         print(f"[+] Directory created: {path}")
 
-    def write_file(self, path: str, data: str, permissions: str = "rw-r--r--"):
-        parts = [p for p in path.strip("/").split("/") if p]
-        filename = parts[-1]
-        node = self.fs_tree
-        for part in parts[:-1]:
-            node = node["children"].setdefault(part, {
-                "type": "dir",
-                "children": {},
-                "permissions": "rwxr-xr-x",
-                "timestamps": {
-                    "created": time.time(),
-                    "modified": time.time(),
-                    "accessed": time.time()
-                }
-            })
-        enc_data = self.encryptor.encrypt(data)
-        node["children"][filename] = {
-            "type": "file",
-            "data": enc_data,
-            "permissions": permissions,
-            "timestamps": {
-                "created": time.time(),
-                "modified": time.time(),
-                "accessed": time.time()
-            }
-        }
-        self.save_filesystem()
+    def write_file(self, path: str, data: Union[str, bytes], permissions: str = "rw-r--r--"):
+        ino, node = self._open(path, permissions)
+        try:
+            self._truncate(node, 0)
+            self._write_range(node, 0, data.encode() if isinstance(data, str) else data)
+            node["permissions"] = permissions
+            self._update_timestamp(node)
+        finally:
+            # even after a failed write the inode must match the bitmap (old blocks are freed)
+            self.inodes.put(ino, node)
+        print(f"[+] File written (encrypted): {path}")
+
+    def write_at(self, path: str, offset: int, data: bytes, permissions: str = "rw-r--r--"):
+        """Write data at offset, extending the file; skipped ranges become holes."""
+        ino, node = self._open(path, permissions)
+        try:
+            self._write_range(node, offset, data)
+            self._update_timestamp(node)
+        finally:
+            self.inodes.put(ino, node)
+
+    def truncate(self, path: str, size: int):
+        """Cut the file to size bytes, or extend it with a hole."""
+        ino, node = self._get_file(path)
+        self._truncate(node, size)
+        self._update_timestamp(node)
+        self.inodes.put(ino, node)
+
+    def write_stream(self, path: str, src, permissions: str = "rw-r--r--", chunk_size: int = CHUNK_SIZE) -> int:
+        """Replace the file's contents with src, a readable file object or a buffer, a chunk at a time."""
+        ino, node = self._open(path, permissions)
+        try:
+            self._truncate(node, 0)
+            for chunk in _chunks(src, chunk_size):
+                self._write_range(node, node["size"], chunk)
+            node["permissions"] = permissions
+            self._update_timestamp(node)
+        finally:
+            self.inodes.put(ino, node)
         print(f"[+] File written (encrypted): {path}")
+        return node["size"]
+
+    def read_stream(self, path: str, dst, chunk_size: int = CHUNK_SIZE) -> int:
+        """Copy the file's plaintext into the writable file object dst, a chunk at a time."""
+        ino, node = self._get_file(path)
+        self._update_timestamp(node, "accessed")
+        self.inodes.put(ino, node)
+        for offset in range(0, node["size"], chunk_size):
+            dst.write(self._read_range(node, offset, chunk_size))
+        return node["size"]
+
+    def read_bytes(self, path: str, offset: int = 0, size: Optional[int] = None) -> bytes:
+        ino, node = self._get_file(path)
+        self._update_timestamp(node, "accessed")
+        self.inodes.put(ino, node)
+        return self._read_range(node, offset, node["size"] if size is None else size)
 
     def read_file(self, path: str) -> str:
-        node = self._get_node(path)
-        if node["type"] != "file":
-            raise IsADirectoryError(path)
-        node["timestamps"]["accessed"] = time.time()
-        dec_data = self.encryptor.decrypt(node["data"])
-        self.save_filesystem()
-        return dec_data
+        return self.read_bytes(path).decode(errors="ignore")
 
     def list_dir(self, path: str = "/"):
-        node = self._get_node(path) if path != "/" else self.fs_tree
-        if node["type"] != "dir":
+        ino = self._lookup(path)
+        if self.inodes.get(ino)["type"] != "dir":
             raise NotADirectoryError(path)
-        return list(node["children"].keys())
+        return [name for name, _ in self.tree.scan(ino)]
+
+    def stat(self, path: str) -> dict:
+        node = self._get_node(path)
+        return {"type": node["type"], "permissions": node["permissions"], "timestamps": node["timestamps"],
+                "size": node["size"], "blocks": sum(n for _, _, n in node["extents"])}
+
+    def check(self) -> dict:
+        """
+        Compare the free-space bitmap with the pages actually reachable from the
+        superblock. `leaked` pages are marked used but belong to nothing,
+        `unmarked` ones are in use but marked free; both should be empty.
+        """
+        pager, reachable = self.pager, set(range(1 + self.pager.bitmap_pages))
+        index_pages = [pager.itable_root]
+        for _ in range(2):
+            reachable.update(index_pages)
+            ptrs = [p for page in index_pages for p in struct.unpack_from(f"<{PTRS_PER_PAGE}I", pager.read(page)) if p]
+            index_pages = ptrs
+        inode_pages = index_pages
+        reachable.update(inode_pages)
+        nodes = [pager.tree_root]
+        while nodes:
+            n = nodes.pop()
+            reachable.add(n)
+            kind, _, ptrs, _ = self.tree._load(n)
+            if kind == INTERNAL:
+                nodes.extend(ptrs)
+        for page in inode_pages:
+            raw = pager.read(page)
+            for slot in range(INODES_PER_PAGE):
+                fields = _INODE.unpack_from(raw, slot * INODE_SIZE)
+                if fields[0] not in (DIR, FILE):
+                    continue
+                extents = [_EXTENT.unpack_from(raw, slot * INODE_SIZE + _INODE.size + i * _EXTENT.size)
+                           for i in range(min(fields[9], INLINE_EXTENTS))]
+                chain = fields[10]
+                while chain:
+                    reachable.add(chain)
+                    chunk = pager.read(chain)
+                    chain, count = _EXTENT_PAGE.unpack_from(chunk)
+                    extents.extend(_EXTENT.unpack_from(chunk, _EXTENT_PAGE.size + i * _EXTENT.size) for i in range(count))
+                for _, first, count in extents:
+                    reachable.update(range(first, first + count))
+        marked = {n for n in range(pager.pages) if pager._used(n)}
+        return {"used": pager.used, "reachable": len(reachable),
+                "leaked": sorted(marked - reachable), "unmarked": sorted(reachable - marked)}
+
+    def usage(self) -> dict:
+        return {"block_size": PAGE_SIZE, "blocks": self.pager.pages, "used": self.pager.used,
+                "free": self.pager.pages - self.pager.used}
+
+    def _release(self, ino: int):
+        node = self.inodes.get(ino)
+        if node["type"] == "dir":
+            for name, child in list(self.tree.scan(ino)):
+                self._release(child)
+                self.tree.remove(self._key(ino, name))
+        else:
+            self._truncate(node, 0)
+        self.inodes.release(ino)
 
     def delete(self, path: str):
-        parts = [p for p in path.strip("/").split("/") if p]
-        node = self.fs_tree
-        for part in parts[:-1]:
-            node = node["children"].get(part)
-            if not node:
-                raise FileNotFoundError(path)
-        node["children"].pop(parts[-1], None)
-        self.save_filesystem()
+        parts = self._parts(path)
+        if not parts:
+            raise PermissionError("Cannot delete the root directory")
+        parent = self._lookup(path, parts[:-1])
+        key = self._key(parent, parts[-1])
+        ino = self.tree.get(key)
+        if ino is not None:
+            self._release(ino)
+            self.tree.remove(key)
         print(f"[-] Deleted: {path}")
 
     def change_metadata(self, path: str, permissions: str = None, timestamps: Dict[str, float] = None):
-        node = self._get_node(path)
+        ino = self._lookup(path)
+        node = self.inodes.get(ino)
         if permissions:
             node["permissions"] = permissions
         if timestamps:
             node["timestamps"].update(timestamps)
-        self.save_filesystem()
-        print(f"[~] Metadata updated for {path}")
\ No newline at end of file
+        self.inodes.put(ino, node)
+        print(f"[~] Metadata updated for {path}")
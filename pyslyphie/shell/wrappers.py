@@ -1,23 +1,420 @@
+import json
 import time
+import inspect
 import functools
+import threading
 import traceback
-def cache(func):
-    memo = {}
+import weakref
+from collections import OrderedDict, namedtuple
+
+from .diskcache import MISSING, DiskCache, digest
+from .jobstore import _sizeof
+from .profiling import PROFILER
+
+CacheInfo = namedtuple("CacheInfo", "hits misses evictions expired maxsize maxbytes ttl currsize currbytes")
+
+
+class _LRU:
+    """The memory tier behind the cache decorators; callers hold `lock`."""
+
+    def __init__(self, maxsize: int, maxbytes, ttl):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires, value, size)
+        self.inflight = {}  # key -> threading.Event set when the first caller is done
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "bytes": 0}
+        self._swept = time.monotonic()
+
+    def _drop(self, key, counter=None):
+        _, _, size = self.entries.pop(key)
+        self.counts["bytes"] -= size
+        if counter:
+            self.counts[counter] += 1
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] is None or entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.counts["hits"] += 1
+                return entry[1]
+            self._drop(key, "expired")
+        return MISSING
+
+    def put(self, key, value, size: int = 0):
+        now = time.monotonic()
+        if self.ttl and now - self._swept > 1.0:
+            self._swept = now
+            for old in [k for k, e in self.entries.items() if e[0] <= now]:
+                self._drop(old, "expired")
+        if self.maxbytes and size > self.maxbytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (now + self.ttl if self.ttl else None, value, size)
+        self.counts["bytes"] += size
+        while len(self.entries) > self.maxsize or (self.maxbytes and self.counts["bytes"] > self.maxbytes):
+            self._drop(next(iter(self.entries)), "evictions")
+
+    def info(self) -> CacheInfo:
+        c = self.counts
+        return CacheInfo(c["hits"], c["misses"], c["evictions"], c["expired"],
+                         self.maxsize, self.maxbytes, self.ttl, len(self.entries), c["bytes"])
+
+    def clear(self):
+        self.entries.clear()
+        for key in self.counts:
+            self.counts[key] = 0
+
+
+def _freeze(value):
+    # hashable stand-in for list/dict/set arguments; the type tag keeps [1] and (1,) apart
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted(((k, _freeze(v)) for k, v in value.items()), key=lambda kv: repr(kv[0]))))
+    if isinstance(value, (set, frozenset)):
+        return ("set", frozenset(_freeze(v) for v in value))
+    return value
+
+
+def _call_key(args, kwargs):
+    """Memory key for a call, or None when an argument cannot be hashed."""
+    key = (_freeze(args), tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _memoized(memory: _LRU, key, load, keep=None):
+    """Serve key from memory, or run load() once for all concurrent callers and keep the result (if keep(result) allows)."""
+    while True:
+        with memory.lock:
+            value = memory.get(key)
+            if value is not MISSING:
+                return value
+            waiting = memory.inflight.get(key)
+            if waiting is None:
+                memory.inflight[key] = threading.Event()
+                memory.counts["misses"] += 1
+                break
+        waiting.wait()
+
+    value = MISSING
+    try:
+        value = load()
+        return value
+    finally:
+        if value is not MISSING and keep is not None and not keep(value):
+            value = MISSING
+        size = _sizeof(value) if memory.maxbytes and value is not MISSING else 0
+        with memory.lock:
+            if value is not MISSING:
+                memory.put(key, value, size)
+            memory.inflight.pop(key).set()
+
+
+def _disk_keys(func, disk, skip_self: bool):
+    """(DiskCache or None, key_of(args, kwargs) -> hashed disk key or None)."""
+    if isinstance(disk, str):
+        disk = DiskCache(disk)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    def key_of(args, kwargs):
+        if disk is None:
+            return None
+        try:
+            return digest(name, json.dumps([args[1:] if skip_self else args, kwargs], sort_keys=True,
+                                           separators=(",", ":"), default=_stable))
+        except (TypeError, ValueError):
+            return None
+
+    return disk, key_of
+
+
+def _disk_tier(func, disk, ttl, skip_self: bool, keep=None):
+    """load(args, kwargs) that goes through the disk cache, when there is one."""
+    disk, key_of = _disk_keys(func, disk, skip_self)
+
+    def load(args, kwargs):
+        dkey = key_of(args, kwargs)
+        value = disk.get(dkey) if dkey is not None else MISSING
+        if value is MISSING:
+            value = func(*args, **kwargs)
+            if dkey is not None and (keep is None or keep(value)):
+                disk.set(dkey, value, ttl)
+        return value
+
+    return disk, load
+
+
+def _stable(value):
+    # json default: make sets order-independent, refuse anything without a stable form
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    raise TypeError(type(value).__name__)
+
+
+def cache(func=None, *, maxsize: int = 256, maxbytes=None, ttl=3600.0, disk=None, disk_ttl=None, cache_if=None):
+    """
+    Memoize func with bounded memory.
+
+    At most `maxsize` entries (and `maxbytes` bytes of results, when set) are
+    kept; the least recently used go first. An entry expires `ttl` seconds
+    after it was stored (None keeps it until evicted). Concurrent callers with
+    the same arguments wait for the first one instead of computing it again.
+    Lists, dicts and sets in the arguments are hashed by value; calls with
+    other unhashable arguments are not kept in memory.
+
+    disk adds a persistent tier behind memory: a DiskCache, or the path of
+    one. Results there outlive the process (for `disk_ttl` seconds, default
+    `ttl`) and are shared with other processes using the same file. Only
+    calls whose arguments have a stable JSON form go to disk; `self` is left
+    out of the disk key of a method.
+
+    cache_if, if given, is called with each result; results it rejects (say an
+    error reply, cache_if=lambda r: r.get("status")) are returned but stored
+    in neither tier.
+
+    Usable as @cache or @cache(maxsize=..., ttl=..., disk=...); the wrapper
+    has cache_info(), cache_clear() and `disk`.
+    """
+    if func is None:
+        return lambda f: cache(f, maxsize=maxsize, maxbytes=maxbytes, ttl=ttl, disk=disk, disk_ttl=disk_ttl,
+                               cache_if=cache_if)
+
+    memory = _LRU(maxsize, maxbytes, ttl)
+    skip_self = "." in func.__qualname__ and list(inspect.signature(func).parameters)[:1] == ["self"]
+    disk, load = _disk_tier(func, disk, disk_ttl or ttl, skip_self, cache_if)
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        key = (args, tuple(sorted(kwargs.items())))
-        if key not in memo:
-            memo[key] = func(*args, **kwargs)
-        return memo[key]
+        key = _call_key(args, kwargs)
+        if key is None:
+            with memory.lock:
+                memory.counts["misses"] += 1
+            return load(args, kwargs)
+        return _memoized(memory, key, lambda: load(args, kwargs), cache_if)
+
+    def cache_info() -> CacheInfo:
+        with memory.lock:
+            return memory.info()
+
+    def cache_clear():
+        """Empty the memory tier; the disk tier is kept (wrapper.disk.clear() empties it)."""
+        with memory.lock:
+            memory.clear()
+
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    wrapper.disk = disk
     return wrapper
 
 
-def timer(func):
+class _InstanceStores:
+    """One _LRU per live instance, keyed by id() and dropped by a finalizer when the instance dies."""
+
+    def __init__(self, maxsize: int, maxbytes, ttl):
+        self.maxsize, self.maxbytes, self.ttl = maxsize, maxbytes, ttl
+        self.stores = {}
+        self.lock = threading.Lock()
+
+    def of(self, obj, create: bool = True):
+        """obj's store, or None when obj cannot be weakly referenced (or has none and create is False)."""
+        with self.lock:
+            memory = self.stores.get(id(obj))
+            if memory is None and create:
+                try:
+                    weakref.finalize(obj, self.stores.pop, id(obj), None)
+                except TypeError:
+                    return None
+                memory = self.stores[id(obj)] = _LRU(self.maxsize, self.maxbytes, self.ttl)
+            return memory
+
+    def info(self, obj=None) -> CacheInfo:
+        if obj is not None:
+            memory = self.of(obj, create=False)
+            if memory is None:
+                return CacheInfo(0, 0, 0, 0, self.maxsize, self.maxbytes, self.ttl, 0, 0)
+            with memory.lock:
+                return memory.info()
+        with self.lock:
+            memories = list(self.stores.values())
+        infos = []
+        for memory in memories:
+            with memory.lock:
+                infos.append(memory.info())
+        total = lambda field: sum(getattr(info, field) for info in infos)
+        return CacheInfo(total("hits"), total("misses"), total("evictions"), total("expired"),
+                         self.maxsize, self.maxbytes, self.ttl, total("currsize"), total("currbytes"))
+
+    def clear(self, obj=None):
+        with self.lock:
+            memories = list(self.stores.values()) if obj is None else [self.stores.get(id(obj))]
+        for memory in memories:
+            if memory is not None:
+                with memory.lock:
+                    memory.clear()
+
+
+def cached_method(func=None, *, maxsize: int = 256, maxbytes=None, ttl=3600.0, disk=None, disk_ttl=None,
+                  cache_if=None):
+    """
+    Like cache, for methods: every instance gets its own memory tier (maxsize,
+    maxbytes and ttl apply per instance), held through a weak reference so the
+    cache never keeps an instance alive; it is dropped with the instance.
+    `self` is not part of the key. An instance that cannot be weakly referenced
+    is not cached in memory. The disk tier, if any, is shared by all instances:
+    its key leaves `self` out, so disk= brings cross-instance sharing back and
+    only suits methods whose result does not depend on instance state.
+
+    wrapper.cache_info(obj) / wrapper.cache_clear(obj) act on one instance;
+    without obj, cache_info sums all live instances and cache_clear empties them.
+    """
+    if func is None:
+        return lambda f: cached_method(f, maxsize=maxsize, maxbytes=maxbytes, ttl=ttl, disk=disk, disk_ttl=disk_ttl,
+                                       cache_if=cache_if)
+
+    stores = _InstanceStores(maxsize, maxbytes, ttl)
+    disk, load = _disk_tier(func, disk, disk_ttl or ttl, True, cache_if)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        memory = stores.of(self)
+        key = _call_key(args, kwargs) if memory is not None else None
+        if key is None:
+            return load((self,) + args, kwargs)
+        return _memoized(memory, key, lambda: load((self,) + args, kwargs), cache_if)
+
+    wrapper.cache_info = stores.info
+    wrapper.cache_clear = stores.clear
+    wrapper.disk = disk
+    return wrapper
+
+
+def acache(func=None, *, maxsize: int = 256, maxbytes=None, ttl=3600.0, disk=None, disk_ttl=None, key=None,
+           cache_if=None):
+    """
+    cache for `async def` functions: the awaited result is stored, not the
+    coroutine. Concurrent awaiters of the same key share one pending task, and
+    cancelling one of them does not cancel it for the others; a call that
+    raises is not cached. Limits, ttl and the disk tier work as in cache (disk
+    reads and writes run in the loop's default executor), and so does cache_if.
+
+    key, if given, is called with the function's arguments and returns what to
+    cache on instead of all of them, e.g. key=lambda self, query, num=100: (query, num);
+    the memory tier is then shared by all instances. Without key, a method gets
+    one memory tier per instance, as with cached_method, held only while the
+    instance is alive; cache_info and cache_clear take an optional instance.
+    """
+    if func is None:
+        return lambda f: acache(f, maxsize=maxsize, maxbytes=maxbytes, ttl=ttl, disk=disk, disk_ttl=disk_ttl, key=key,
+                                cache_if=cache_if)
+
+    import asyncio
+
+    skip_self = key is None and "." in func.__qualname__ and list(inspect.signature(func).parameters)[:1] == ["self"]
+    shared = None if skip_self else _LRU(maxsize, maxbytes, ttl)
+    stores = _InstanceStores(maxsize, maxbytes, ttl) if skip_self else None
+    disk, key_of = _disk_keys(func, disk, skip_self)
+
+    async def load(args, kwargs, ckey):
+        loop = asyncio.get_running_loop()
+        dkey = key_of((ckey,), {}) if key is not None else key_of(args, kwargs)
+        if dkey is not None:
+            value = await loop.run_in_executor(None, disk.get, dkey)
+            if value is not MISSING:
+                return value
+        value = await func(*args, **kwargs)
+        if dkey is not None and (cache_if is None or cache_if(value)):
+            await loop.run_in_executor(None, disk.set, dkey, value, disk_ttl or ttl)
+        return value
+
+    def settle(memory, mkey, task):
+        value = MISSING if task.cancelled() or task.exception() is not None else task.result()
+        if value is not MISSING and cache_if is not None and not cache_if(value):
+            value = MISSING
+        size = _sizeof(value) if maxbytes and value is not MISSING else 0
+        with memory.lock:
+            if memory.inflight.get(mkey) is task:
+                del memory.inflight[mkey]
+            if value is not MISSING:
+                memory.put(mkey, value, size)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        ckey = key(*args, **kwargs) if key is not None else (args, kwargs)
+        if skip_self:
+            # keyed without self, in a store that dies with the instance, so the cache never keeps it alive
+            memory = stores.of(args[0]) if args else None
+            mkey = _call_key(args[1:], kwargs) if memory is not None else None
+        else:
+            memory = shared
+            mkey = _call_key((ckey,), {}) if key is not None else _call_key(args, kwargs)
+        if mkey is None:
+            if memory is not None:
+                with memory.lock:
+                    memory.counts["misses"] += 1
+            return await load(args, kwargs, ckey)
+
+        loop = asyncio.get_running_loop()
+        with memory.lock:
+            value = memory.get(mkey)
+            if value is not MISSING:
+                return value
+            task = memory.inflight.get(mkey)
+            if task is not None and task.get_loop() is loop:
+                memory.counts["hits"] += 1
+            else:
+                # nothing pending here; a task from another event loop cannot be awaited from this one
+                task = loop.create_task(load(args, kwargs, ckey))
+                task.add_done_callback(functools.partial(settle, memory, mkey))
+                memory.inflight[mkey] = task
+                memory.counts["misses"] += 1
+        return await asyncio.shield(task)
+
+    def cache_info(obj=None) -> CacheInfo:
+        if stores is not None:
+            return stores.info(obj)
+        with shared.lock:
+            return shared.info()
+
+    def cache_clear(obj=None):
+        """Empty the memory tier; the disk tier is kept (wrapper.disk.clear() empties it)."""
+        if stores is not None:
+            return stores.clear(obj)
+        with shared.lock:
+            shared.clear()
+
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    wrapper.disk = disk
+    return wrapper
+
+
+def timer(func=None, *, name=None, verbose: bool = False):
+    """
+    Record each call's duration in the profiling registry (profiling.PROFILER:
+    percentiles, sampled cProfile/tracemalloc captures, dump()). verbose also
+    prints one line per call.
+    """
+    if func is None:
+        return lambda f: timer(f, name=name, verbose=verbose)
+    label = name or f"{func.__module__}.{func.__qualname__}"
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.time()
-        result = func(*args, **kwargs)
-        end = time.time()
-        print(f"⏱️ {func.__name__} took {end - start:.5f}s")
-        return result
+        if not verbose:
+            return PROFILER.call(label, func, args, kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return PROFILER.call(label, func, args, kwargs)
+        finally:
+            print(f"⏱️ {func.__name__} took {(time.perf_counter_ns() - start) / 1e9:.5f}s")
     return wrapper